@@ -0,0 +1,53 @@
+"""Make It Quote画像生成のベンチマーク
+
+アバターを模した画像から引用画像を繰り返し生成し、1枚あたりの時間を計測する。
+フォントはassets/fontsのものか、引数で指定したファイルを使う。
+
+使い方: python benchmarks/bench_miq.py [フォントファイル]
+"""
+import sys
+import time
+from pathlib import Path
+from typing import Final
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.miq import MakeItQuote
+
+
+WARMUP: Final[int] = 2
+ITERATIONS: Final[int] = 20
+AVATAR_SIZE: Final[int] = 1024
+QUOTES: Final[tuple] = (
+    "今日の配信何時から？",
+    "さっきのボス強すぎて無理だった。次はもう少しレベルを上げてから挑戦しようと思う",
+    "Stay hungry, stay foolish.",
+    "明日は雨らしいね。傘を忘れないように気をつけて、あと洗濯物も早めに取り込んでおこう",
+)
+
+
+def make_avatar() -> Image.Image:
+    """グラデーションのアバター画像を生成"""
+    gradient = Image.linear_gradient("L").resize((AVATAR_SIZE, AVATAR_SIZE))
+    return Image.merge("RGB", (gradient, gradient.rotate(90), gradient.rotate(180)))
+
+
+def main() -> None:
+    font_path = sys.argv[1] if len(sys.argv) > 1 else None
+    miq = MakeItQuote()
+    avatar = make_avatar()
+
+    for i in range(WARMUP):
+        miq.create_quote(QUOTES[i % len(QUOTES)], "Swiftly", font_path=font_path, background_image=avatar)
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        miq.create_quote(QUOTES[i % len(QUOTES)], "Swiftly", font_path=font_path, background_image=avatar)
+    elapsed = (time.perf_counter() - start) / ITERATIONS
+    print(f"create_quote: {elapsed * 1e3:7.2f} ms/quote")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""禁止チャンネル判定のマイクロベンチマーク
+
+DBへの問い合わせ（変更前）とメモリ上のインデックス参照（変更後）で
+1インタラクションあたりのオーバーヘッドを比較する。
+
+使い方: python benchmarks/bench_prohibited_channels.py
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Final
+
+import aiosqlite
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot import DatabaseManager
+
+
+GUILDS: Final[int] = 1000
+CHANNELS_PER_GUILD: Final[int] = 5
+ITERATIONS: Final[int] = 20000
+
+
+async def bench_query(conn: aiosqlite.Connection) -> float:
+    """変更前: 毎回SELECTを発行"""
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        async with conn.execute(
+            """
+            SELECT 1 FROM prohibited_channels
+            WHERE guild_id = ? AND channel_id = ?
+            """,
+            (str(i % GUILDS), str(i % CHANNELS_PER_GUILD))
+        ) as cursor:
+            await cursor.fetchone()
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def bench_index(db: DatabaseManager) -> float:
+    """変更後: メモリ上のインデックスを参照"""
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        db.is_channel_prohibited(i % GUILDS, i % CHANNELS_PER_GUILD)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(Path(tmp) / "prohibited_channels.db")
+        await db.initialize()
+        await db._connection.executemany(
+            "INSERT INTO prohibited_channels (guild_id, channel_id) VALUES (?, ?)",
+            [
+                (str(g), str(c))
+                for g in range(GUILDS)
+                for c in range(0, CHANNELS_PER_GUILD, 2)
+            ]
+        )
+        await db._connection.commit()
+        await db.load_prohibited_channels()
+
+        before = await bench_query(db._connection)
+        after = bench_index(db)
+        await db.cleanup()
+
+    print(f"query : {before * 1e6:8.2f} us/interaction")
+    print(f"index : {after * 1e6:8.2f} us/interaction")
+    print(f"speedup: x{before / after:.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
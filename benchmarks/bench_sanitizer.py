@@ -0,0 +1,110 @@
+"""メッセージのサニタイズのマイクロベンチマーク
+
+読み上げ対象のチャットを模したコーパスで、パターンごとにre.subを繰り返す方法（変更前）と
+1つの正規表現・1回の走査で置換する方法（変更後）を比較する。
+結果が一致することも確認する。
+
+使い方: python benchmarks/bench_sanitizer.py
+"""
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Final, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.sanitizer import TTS_SANITIZER
+
+
+CORPUS_SIZE: Final[int] = 20000
+REPEAT: Final[int] = 5
+SEED: Final[int] = 0
+
+# 変更前のcogs/voice.pyのパターン
+LEGACY_PATTERNS: Final[Dict[str, str]] = {
+    "url": r"http[s]?://[^\s<>]+",
+    "user_mention": r"<@!?[0-9]+>",
+    "role_mention": r"<@&[0-9]+>",
+    "channel_mention": r"<#[0-9]+>"
+}
+
+PLAIN_LINES: Final[List[str]] = [
+    "おはよう",
+    "それな",
+    "草",
+    "今日の配信何時から？",
+    "さっきのボス強すぎて無理だった",
+    "了解です！",
+    "明日は雨らしいね",
+    "www",
+    "ちょっと離席します",
+    "昼ごはん何にしよう",
+    "そのアップデートいつ来るんだろう",
+    "gg",
+    "お疲れさまでした〜",
+]
+URLS: Final[List[str]] = [
+    "https://example.com/watch?v=abc123",
+    "http://example.org/news/2024/01/01/article",
+    "https://discord.com/channels/123/456/789",
+]
+
+
+def legacy_sanitize(text: str) -> str:
+    """変更前: パターンごとに未コンパイルのre.subを実行"""
+    result = text
+    for pattern_name, pattern in LEGACY_PATTERNS.items():
+        if pattern_name == "url":
+            result = re.sub(pattern, "URL省略", result)
+        else:
+            result = re.sub(pattern, "メンション省略", result)
+    return result
+
+
+def build_corpus() -> List[str]:
+    """約8割が装飾のない文、残りにURL・メンションを含むチャットを生成"""
+    rng = random.Random(SEED)
+    corpus = []
+    for _ in range(CORPUS_SIZE):
+        line = rng.choice(PLAIN_LINES)
+        roll = rng.random()
+        if roll < 0.08:
+            line = f"{line} {rng.choice(URLS)}"
+        elif roll < 0.14:
+            line = f"<@{rng.randrange(10**17, 10**18)}> {line}"
+        elif roll < 0.17:
+            line = f"<@&{rng.randrange(10**17, 10**18)}> {line}"
+        elif roll < 0.20:
+            line = f"{line} <#{rng.randrange(10**17, 10**18)}>"
+        corpus.append(line)
+    return corpus
+
+
+def bench(corpus: List[str], func) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for line in corpus:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(corpus)
+
+
+def main() -> None:
+    corpus = build_corpus()
+    mismatches = [line for line in corpus if legacy_sanitize(line) != TTS_SANITIZER.sanitize(line)]
+    if mismatches:
+        print(f"mismatch: {mismatches[:3]}")
+        sys.exit(1)
+
+    before = bench(corpus, legacy_sanitize)
+    after = bench(corpus, TTS_SANITIZER.sanitize)
+    print(f"legacy   : {before * 1e6:6.2f} us/message")
+    print(f"sanitizer: {after * 1e6:6.2f} us/message")
+    print(f"speedup  : x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
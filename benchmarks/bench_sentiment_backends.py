@@ -0,0 +1,79 @@
+"""感情分類バックエンドごとのレイテンシとメモリ使用量のベンチマーク
+
+読み込み後のRSSを正しく測るため、バックエンドごとに新しいプロセスで計測する。
+
+使い方: python benchmarks/bench_sentiment_backends.py [--backends fp32 int8 onnx]
+"""
+import argparse
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Final, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.sentiment_samples import SAMPLES
+from lib.sentiment import BACKENDS, DEFAULT_MAX_BATCH_SIZE, SentimentClassifier
+
+
+WARMUP: Final[int] = 2
+ITERATIONS: Final[int] = 10
+
+
+def _current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize() / 1024 / 1024
+
+
+def _measure(texts: List[str], classifier: SentimentClassifier) -> float:
+    for _ in range(WARMUP):
+        classifier.logits(texts)
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        classifier.logits(texts)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_backend(backend: str) -> Dict[str, float]:
+    base_rss = _current_rss_mb()
+    start = time.perf_counter()
+    classifier = SentimentClassifier(backend=backend)
+    load_time = time.perf_counter() - start
+    loaded_rss = _current_rss_mb()
+
+    return {
+        "load_s": load_time,
+        "single_ms": _measure(list(SAMPLES[:1]), classifier) * 1000,
+        "batch_ms": _measure(list(SAMPLES[:DEFAULT_MAX_BATCH_SIZE]), classifier) * 1000,
+        "rss_mb": loaded_rss - base_rss,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    print(
+        f"{'backend':8} {'load(s)':>8} {'1 text(ms)':>11} "
+        f"{f'{DEFAULT_MAX_BATCH_SIZE} texts(ms)':>13} {'RSS(MB)':>8} {'peak(MB)':>9}"
+    )
+    context = multiprocessing.get_context("spawn")
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            r = pool.apply(run_backend, (backend,))
+        print(
+            f"{backend:8} {r['load_s']:8.1f} {r['single_ms']:11.1f} "
+            f"{r['batch_ms']:13.1f} {r['rss_mb']:8.0f} {r['peak_rss_mb']:9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
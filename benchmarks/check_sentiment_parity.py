@@ -0,0 +1,55 @@
+"""感情分類バックエンドのパリティチェック
+
+固定の日本語サンプルについて、fp32モデルと各バックエンドの予測クラスの一致率を確認する。
+一致率がしきい値を下回った場合は終了コード1で終了する。
+
+使い方: python benchmarks/check_sentiment_parity.py [--threshold 0.9] [--backends int8 onnx]
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Final
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.sentiment_samples import SAMPLES
+from lib.sentiment import BACKENDS, SentimentClassifier
+
+
+DEFAULT_THRESHOLD: Final[float] = 0.9
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=[b for b in BACKENDS if b != "fp32"],
+        choices=BACKENDS
+    )
+    args = parser.parse_args()
+
+    texts = list(SAMPLES)
+    reference = SentimentClassifier(backend="fp32").logits(texts)
+    expected = reference.argmax(axis=1)
+
+    failed = False
+    for backend in args.backends:
+        logits = SentimentClassifier(backend=backend).logits(texts)
+        agreement = float(np.mean(logits.argmax(axis=1) == expected))
+        max_diff = float(np.abs(logits - reference).max())
+        ok = agreement >= args.threshold
+        failed |= not ok
+        print(
+            f"{backend:5}: top-1 agreement {agreement:6.1%} "
+            f"(max logit diff {max_diff:.3f}) {'OK' if ok else 'FAIL'}"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
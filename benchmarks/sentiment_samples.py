@@ -0,0 +1,29 @@
+"""感情分類のパリティチェック・ベンチマーク用の固定サンプル"""
+from typing import Final, Tuple
+
+SAMPLES: Final[Tuple[str, ...]] = (
+    "今日は最高の一日だった！",
+    "試験に合格して本当にうれしい。",
+    "大切にしていたマグカップが割れてしまった。",
+    "友達が引っ越してしまって寂しい。",
+    "来週の旅行が楽しみで仕方ない。",
+    "新しいゲームの発売が待ち遠しい。",
+    "まさかこんなところで会うとは思わなかった。",
+    "え、もう締め切り過ぎてたの？",
+    "何度言っても約束を守らないので腹が立つ。",
+    "電車で足を踏まれたのに謝りもしなかった。",
+    "夜道を一人で歩くのが怖い。",
+    "地震が続いていて不安だ。",
+    "部屋の隅にゴキブリがいて気持ち悪い。",
+    "あの人の態度は本当に嫌だ。",
+    "彼ならきっとやり遂げてくれると信じている。",
+    "このお店の店員さんはいつも丁寧で安心できる。",
+    "雨のせいで予定が全部中止になった。",
+    "宝くじが当たった！信じられない！",
+    "サーバーが落ちていて何もできない。",
+    "みんなのおかげで無事にイベントを終えられました。",
+    "明日の発表がうまくいくか心配です。",
+    "久しぶりに家族とご飯を食べて楽しかった。",
+    "頼んでいた荷物がまた届かない。",
+    "推しの新曲が神すぎて泣いた。",
+)
@@ -2,13 +2,12 @@
 # Developed by: TechFish_1
 # Standard library imports
 import asyncio
-import json
 import logging
 import os
 import time
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, Final, Optional, Set
+from typing import Dict, Final, Iterable, Optional, Set
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
@@ -16,7 +15,12 @@ import aiosqlite
 import discord
 import dotenv
 from discord.ext import commands
+from lib.chart_renderer import ChartRenderer
+from lib.forecast_cache import ForecastCache
+from lib.forecast_executor import ForecastExecutor
+from lib.join_series import JoinSeriesCache
 from module.logger import LoggingCog
+from module.user_count import UserCountStore
 
 
 SHARD_COUNT: Final[int] = None
@@ -28,6 +32,7 @@ PATHS: Final[dict] = {
     "log_dir": Path("./log"),
     "db": Path("data/prohibited_channels.db"),
     "user_count": Path("data/user_count.json"),
+    "forecast_cache": Path("data/forecast_cache"),
     "cogs_dir": Path("./cogs")
 }
 
@@ -92,6 +97,8 @@ class DatabaseManager:
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._connection: Optional[aiosqlite.Connection] = None
+        # guild_id -> 禁止チャンネルIDのセット（コマンド毎のDB問い合わせを避けるためのインデックス）
+        self._prohibited_channels: Dict[int, Set[int]] = {}
 
     async def initialize(self) -> None:
         """DBを初期化"""
@@ -104,6 +111,21 @@ class DatabaseManager:
             )
         """)
         await self._connection.commit()
+        await self.load_prohibited_channels()
+
+    async def load_prohibited_channels(self) -> None:
+        """禁止チャンネルをDBからメモリ上のインデックスに読み込み"""
+        index: Dict[int, Set[int]] = {}
+        async with self._connection.execute(
+            "SELECT guild_id, channel_id FROM prohibited_channels"
+        ) as cursor:
+            async for guild_id, channel_id in cursor:
+                index.setdefault(int(guild_id), set()).add(int(channel_id))
+        self._prohibited_channels = index
+        logger.info(
+            "Loaded %s prohibited channels",
+            sum(len(channels) for channels in index.values())
+        )
 
     async def cleanup(self) -> None:
         """DB接続を閉じる"""
@@ -111,27 +133,32 @@ class DatabaseManager:
             await self._connection.close()
             self._connection = None
 
-    async def is_channel_prohibited(
+    def is_channel_prohibited(
         self,
         guild_id: int,
         channel_id: int
     ) -> bool:
-        try:
-            if not self._connection:
-                await self.initialize()
-
-            async with self._connection.execute(
-                """
-                SELECT 1 FROM prohibited_channels
-                WHERE guild_id = ? AND channel_id = ?
-                """,
-                (str(guild_id), str(channel_id))
-            ) as cursor:
-                return bool(await cursor.fetchone())
+        """メモリ上のインデックスを参照して禁止チャンネルか判定（I/Oなし）"""
+        channels = self._prohibited_channels.get(guild_id)
+        return channels is not None and channel_id in channels
 
-        except Exception as e:
-            logger.error("Database error: %s", e, exc_info=True)
-            return False
+    def set_channel_prohibited(
+        self,
+        guild_id: int,
+        channel_id: int,
+        prohibited: bool
+    ) -> None:
+        """DB更新後にインデックスを同期"""
+        if prohibited:
+            self._prohibited_channels.setdefault(guild_id, set()).add(channel_id)
+            return
+
+        channels = self._prohibited_channels.get(guild_id)
+        if channels is None:
+            return
+        channels.discard(channel_id)
+        if not channels:
+            del self._prohibited_channels[guild_id]
 
 class UserCountManager:
     """ユーザー数管理を行うクラス"""
@@ -140,45 +167,68 @@ class UserCountManager:
         self.file_path = file_path
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
         self._last_update = 0
-        self._cache: Dict[str, Any] = {}
+        self._store = UserCountStore(file_path)
 
-    def _read_count(self) -> int:
-        """ファイルからユーザー数を読み込み"""
+    def get_count(self) -> int:
+        """現在のユーザー数を取得"""
         try:
-            if self.file_path.exists():
-                data = json.loads(self.file_path.read_text(encoding="utf-8"))
-                return data.get("total_users", 0)
+            return self._store.read()
+        except FileNotFoundError:
             return 0
         except Exception as e:
             logger.error("Error reading user count: %s", e, exc_info=True)
             return 0
 
-    def _write_count(self, count: int) -> None:
-        """ユーザー数をファイルに書き込み"""
-        try:
-            self.file_path.write_text(
-                json.dumps(
-                    {"total_users": count},
-                    ensure_ascii=False,
-                    indent=4
-                ),
-                encoding="utf-8"
-            )
-        except Exception as e:
-            logger.error("Error writing user count: %s", e, exc_info=True)
-
-    def get_count(self) -> int:
-        """現在のユーザー数を取得"""
-        return self._read_count()
-
     def update_count(self, count: int) -> None:
-        self._write_count(count)
+        """ユーザー数を更新（書き込みはバックグラウンドで実行）"""
+        self._store.schedule_write(count)
         self._last_update = time.time()
 
+    async def flush(self) -> None:
+        """未書き込みのユーザー数をファイルに反映"""
+        await self._store.flush()
+
     def should_update(self) -> bool:
         """更新が必要かどうかを判定"""
         return time.time() - self._last_update >= STATUS_UPDATE_COOLDOWN
 
+class UniqueUserIndex:
+    """ユーザーIDごとに共有サーバー数を参照カウントするインデックス"""
+
+    def __init__(self) -> None:
+        self._refcounts: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._refcounts)
+
+    def rebuild(self, guilds: Iterable[discord.Guild]) -> None:
+        """全サーバーのメンバーから再集計"""
+        refcounts: Dict[int, int] = {}
+        for guild in guilds:
+            for member in guild.members:
+                refcounts[member.id] = refcounts.get(member.id, 0) + 1
+        self._refcounts = refcounts
+
+    def add(self, user_id: int) -> None:
+        self._refcounts[user_id] = self._refcounts.get(user_id, 0) + 1
+
+    def remove(self, user_id: int) -> None:
+        count = self._refcounts.get(user_id)
+        if count is None:
+            return
+        if count <= 1:
+            del self._refcounts[user_id]
+        else:
+            self._refcounts[user_id] = count - 1
+
+    def add_guild(self, guild: discord.Guild) -> None:
+        for member in guild.members:
+            self.add(member.id)
+
+    def remove_guild(self, guild: discord.Guild) -> None:
+        for member in guild.members:
+            self.remove(member.id)
+
 class SwiftlyBot(commands.AutoShardedBot):
     """Swiftlyボットのメインクラス"""
 
@@ -196,6 +246,13 @@ class SwiftlyBot(commands.AutoShardedBot):
 
         self.db = DatabaseManager(PATHS["db"])
         self.user_count = UserCountManager(PATHS["user_count"])
+        self.unique_users = UniqueUserIndex()
+        self.forecaster = ForecastExecutor(
+            cache=ForecastCache(cache_dir=PATHS["forecast_cache"])
+        )
+        self.join_series = JoinSeriesCache()
+        self.chart_renderer = ChartRenderer()
+        self._user_count_flush: Optional[asyncio.Task] = None
         self._setup_logging()
 
         # ファイル監視の設定
@@ -302,28 +359,53 @@ class SwiftlyBot(commands.AutoShardedBot):
             await asyncio.sleep(300)  # 5分に変更
 
     async def count_unique_users(self) -> None:
-        """ユニークユーザー数を集計"""
-        unique_users: Set[int] = set()
-        for guild in self.guilds:
-            unique_users.update(member.id for member in guild.members)
-
-        count = len(unique_users)
+        """ユニークユーザー数を全サーバーから再集計"""
+        self.unique_users.rebuild(self.guilds)
+        count = len(self.unique_users)
         logger.info("Unique user count: %s", count)
         self.user_count.update_count(count)
 
+    def _schedule_user_count_flush(self) -> None:
+        """ユーザー数の書き込みをまとめて遅延実行"""
+        if self._user_count_flush and not self._user_count_flush.done():
+            return
+        self._user_count_flush = asyncio.create_task(self._flush_user_count())
+
+    async def _flush_user_count(self) -> None:
+        await asyncio.sleep(STATUS_UPDATE_COOLDOWN)
+        self.user_count.update_count(len(self.unique_users))
+
     async def on_ready(self) -> None:
         """準備完了時の処理"""
         logger.info("Logged in as %s", self.user)
+        # 切断中のメンバー変動を取りこぼしている可能性があるため次回参照時に再構築
+        self.join_series.clear()
         await self.count_unique_users()
         await self.update_presence()  # on_readyで一度だけ呼び出す
 
-    async def on_member_join(self, _) -> None:
+    async def on_member_join(self, member: discord.Member) -> None:
         """メンバー参加時の処理"""
-        await self.count_unique_users()
+        self.unique_users.add(member.id)
+        self.join_series.add(member)
+        self._schedule_user_count_flush()
 
-    async def on_member_remove(self, _) -> None:
+    async def on_member_remove(self, member: discord.Member) -> None:
         """メンバー退出時の処理"""
-        await self.count_unique_users()
+        self.unique_users.remove(member.id)
+        self.join_series.remove(member)
+        self._schedule_user_count_flush()
+
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        """サーバー参加時の処理"""
+        self.unique_users.add_guild(guild)
+        self._schedule_user_count_flush()
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """サーバー退出時の処理"""
+        self.unique_users.remove_guild(guild)
+        self.forecaster.cancel_guild(guild.id)
+        self.join_series.drop_guild(guild.id)
+        self._schedule_user_count_flush()
 
     async def on_app_command_error(
         self,
@@ -347,7 +429,7 @@ class SwiftlyBot(commands.AutoShardedBot):
         if ctx.command and ctx.command.name == "set_mute_channel":
             return True
 
-        is_prohibited = await self.db.is_channel_prohibited(
+        is_prohibited = self.db.is_channel_prohibited(
             ctx.guild.id,
             ctx.channel.id
         )
@@ -376,7 +458,7 @@ class SwiftlyBot(commands.AutoShardedBot):
             interaction.command.name == "set_mute_channel"):
             return True
 
-        is_prohibited = await self.db.is_channel_prohibited(
+        is_prohibited = self.db.is_channel_prohibited(
             interaction.guild_id,
             interaction.channel_id
         )
@@ -412,6 +494,11 @@ def main() -> None:
         # ファイル監視を停止
         bot.observer.stop()
         bot.observer.join()
+        bot.forecaster.shutdown()
+        bot.chart_renderer.shutdown()
+        loop.run_until_complete(bot.user_count.flush())
+        if bot.forecaster.cache is not None:
+            loop.run_until_complete(bot.forecaster.cache.flush())
         loop.run_until_complete(bot.db.cleanup())
 
 if __name__ == "__main__":
@@ -179,6 +179,8 @@ class ServerBoard(commands.Cog):
     async def setup_database(self) -> None:
         try:
             async with aiosqlite.connect(DB_PATH) as conn:
+                # WebAPI側の読み込みと/upなどの書き込みが互いを塞がないようにする
+                await conn.execute("PRAGMA journal_mode=WAL")
                 await conn.execute("""
                     CREATE TABLE IF NOT EXISTS servers (
                         server_id INTEGER PRIMARY KEY,
@@ -191,6 +193,11 @@ class ServerBoard(commands.Cog):
                         invite_url TEXT
                     )
                 """)
+                # WebAPIのキーセットページング用
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_servers_last_up_registered
+                    ON servers (last_up_time, registered_at)
+                """)
                 await conn.commit()
 
             async with aiosqlite.connect(UP_DB_PATH) as conn:
@@ -95,7 +95,9 @@ class Prohibited(commands.Cog):
                         (str(guild_id), str(channel_id))
                     )
                 await db.commit()
-                return not is_prohibited
+
+            self._sync_prohibited_index(guild_id, channel_id, not is_prohibited)
+            return not is_prohibited
         except Exception as e:
             logger.error(
                 "Error toggling channel prohibition: %s", e,
@@ -103,6 +105,17 @@ class Prohibited(commands.Cog):
             )
             raise
 
+    def _sync_prohibited_index(
+        self,
+        guild_id: int,
+        channel_id: int,
+        prohibited: bool
+    ) -> None:
+        """ボット側の禁止チャンネルインデックスをDBと同期"""
+        db_manager = getattr(self.bot, "db", None)
+        if db_manager is not None and hasattr(db_manager, "set_channel_prohibited"):
+            db_manager.set_channel_prohibited(guild_id, channel_id, prohibited)
+
     def _create_response_embed(
         self,
         channel: discord.TextChannel,
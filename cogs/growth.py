@@ -1,44 +1,44 @@
 import asyncio
-import io
 from datetime import datetime
-from typing import Final, List, Optional, Tuple
+from typing import Final, Optional
 import logging
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
 
 import discord
 from discord.ext import commands
 
+from lib.chart_renderer import ChartTemplate, GrowthChart
+from lib.forecast_executor import ForecastExecutor, ForecastQueueFull
+from lib.growth_models import fit_polynomial
+from lib.growth_solver import first_polynomial_crossing
+from lib.join_series import (
+    fingerprint,
+    ordinals_to_datetime64,
+    to_datetime,
+    to_datetime64,
+    to_ordinals
+)
+
 
 POLYNOMIAL_DEGREE: Final[int] = 3
 PREDICTION_DAYS: Final[int] = 36500  # 100年分
-GRAPH_SIZE: Final[Tuple[int, int]] = (12, 8)
 PROGRESS_INTERVAL: Final[int] = 10
 PROGRESS_DELAY: Final[float] = 0.1
 
 ERROR_MESSAGES: Final[dict] = {
     "insufficient_data": "回帰分析を行うためのデータが不足しています。",
     "no_target_reach": "予測範囲内でその目標値に到達しません。",
+    "busy": "現在予測処理が混み合っています。しばらくしてから再度お試しください。",
     "unexpected": "エラーが発生しました: {}"
 }
 
-GRAPH_SETTINGS: Final[dict] = {
-    "colors": {
-        "actual": "blue",
-        "prediction": "red",
-        "target": "green",
-        "date": "purple"
-    },
-    "alpha": 0.6,
-    "linewidth": 2,
-    "fontsize": {
-        "label": 14,
-        "title": 16
-    }
-}
+CHART_TEMPLATE: Final[ChartTemplate] = ChartTemplate(
+    figsize=(12, 8),
+    title="Server Growth Prediction",
+    label_fontsize=14,
+    title_fontsize=16
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,111 +47,65 @@ class GrowthPredictor:
 
     def __init__(
         self,
-        join_dates: List[datetime],
+        join_timestamps: np.ndarray,
         target: int
     ) -> None:
-        self.join_dates = join_dates
+        self.join_timestamps = join_timestamps
         self.target = target
-        self.X = np.array([d.toordinal() for d in join_dates]).reshape(-1, 1)
-        self.y = np.arange(1, len(join_dates) + 1)
+        self.X = to_ordinals(join_timestamps).reshape(-1, 1)
+        self.y = np.arange(1, len(join_timestamps) + 1)
 
-        self.poly = PolynomialFeatures(degree=POLYNOMIAL_DEGREE)
-        self.model = LinearRegression()
-        self._fit_model()
+        self.coefficients: Optional[np.ndarray] = None
+        self.score = 0.0
 
-    def _fit_model(self) -> None:
-        """モデルを学習"""
-        X_poly = self.poly.fit_transform(self.X)
-        self.model.fit(X_poly, self.y)
+    async def fit_model(
+        self,
+        forecaster: ForecastExecutor,
+        guild_id: int
+    ) -> None:
+        """モデルをワーカープロセスで学習（メンバーが変わっていなければキャッシュを再利用）"""
+        result = await forecaster.submit(
+            guild_id,
+            "growth",
+            fit_polynomial,
+            self.X.ravel(),
+            self.y,
+            POLYNOMIAL_DEGREE,
+            fingerprint=fingerprint(self.join_timestamps)
+        )
+        self.coefficients = result["coefficients"]
+        self.score = float(result["score"])
 
     def predict_target_date(self) -> Optional[datetime]:
-        future_days = np.arange(
-            self.X[-1][0],
-            self.X[-1][0] + PREDICTION_DAYS
-        ).reshape(-1, 1)
-        future_days_poly = self.poly.transform(future_days)
-        predictions = self.model.predict(future_days_poly)
-
-        for i, pred in enumerate(predictions):
-            if pred >= self.target:
-                return datetime.fromordinal(int(future_days[i][0]))
-        return None
-
-    def create_prediction_plot(
+        ordinal = first_polynomial_crossing(
+            self.coefficients,
+            int(self.X[-1][0]),
+            PREDICTION_DAYS,
+            self.target
+        )
+        return datetime.fromordinal(ordinal) if ordinal is not None else None
+
+    def build_chart(
         self,
         target_date: datetime
-    ) -> io.BytesIO:
+    ) -> GrowthChart:
+        """グラフ描画用のデータを作成"""
         X_plot = np.linspace(
             self.X[0][0],
             target_date.toordinal(),
             200
-        ).reshape(-1, 1)
-        X_plot_poly = self.poly.transform(X_plot)
-        y_plot = self.model.predict(X_plot_poly)
-
-        plt.figure(figsize=GRAPH_SIZE)
-
-        # 実データのプロット
-        plt.scatter(
-            self.join_dates,
-            self.y,
-            color=GRAPH_SETTINGS["colors"]["actual"],
-            label="Actual Data",
-            alpha=GRAPH_SETTINGS["alpha"]
         )
-
-        # 予測線のプロット
-        plt.plot(
-            [datetime.fromordinal(int(x[0])) for x in X_plot],
-            y_plot,
-            color=GRAPH_SETTINGS["colors"]["prediction"],
-            label="Prediction",
-            linewidth=GRAPH_SETTINGS["linewidth"]
+        return GrowthChart(
+            actual_x=to_datetime64(self.join_timestamps),
+            actual_y=self.y,
+            prediction_x=ordinals_to_datetime64(X_plot),
+            prediction_y=np.polynomial.polynomial.polyval(X_plot, self.coefficients),
+            target=self.target,
+            target_date=target_date
         )
 
-        # 目標値と予測日の線
-        plt.axhline(
-            y=self.target,
-            color=GRAPH_SETTINGS["colors"]["target"],
-            linestyle="--",
-            label=f"Target: {self.target}",
-            linewidth=GRAPH_SETTINGS["linewidth"]
-        )
-        plt.axvline(
-            x=target_date,
-            color=GRAPH_SETTINGS["colors"]["date"],
-            linestyle="--",
-            label=f"Predicted: {target_date.date()}",
-            linewidth=GRAPH_SETTINGS["linewidth"]
-        )
-
-        # グラフの設定
-        plt.xlabel(
-            "Join Date",
-            fontsize=GRAPH_SETTINGS["fontsize"]["label"]
-        )
-        plt.ylabel(
-            "Member Count",
-            fontsize=GRAPH_SETTINGS["fontsize"]["label"]
-        )
-        plt.title(
-            "Server Growth Prediction",
-            fontsize=GRAPH_SETTINGS["fontsize"]["title"]
-        )
-        plt.legend()
-        plt.grid(True, linestyle="--", alpha=GRAPH_SETTINGS["alpha"])
-
-        # 画像として保存
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", dpi=100, bbox_inches="tight")
-        buf.seek(0)
-        plt.close()
-
-        return buf
-
     def get_model_score(self) -> float:
-        X_poly = self.poly.transform(self.X)
-        return self.model.score(X_poly, self.y)
+        return self.score
 
 class Growth(commands.Cog):
     """サーバーの成長予測機能を提供"""
@@ -179,7 +133,7 @@ class Growth(commands.Cog):
         self,
         target: int,
         target_date: datetime,
-        join_dates: List[datetime],
+        join_timestamps: np.ndarray,
         model_score: float,
         show_graph: bool = True
     ) -> discord.Embed:
@@ -194,10 +148,10 @@ class Growth(commands.Cog):
 
         # フィールドの追加
         fields = {
-            "データポイント数": str(len(join_dates)),
+            "データポイント数": str(len(join_timestamps)),
             "予測精度": f"{model_score:.2f}",
-            "最初の参加日": join_dates[0].strftime("%Y-%m-%d"),
-            "最新の参加日": join_dates[-1].strftime("%Y-%m-%d"),
+            "最初の参加日": to_datetime(join_timestamps[0]).strftime("%Y-%m-%d"),
+            "最新の参加日": to_datetime(join_timestamps[-1]).strftime("%Y-%m-%d"),
             "予測モデル": f"{POLYNOMIAL_DEGREE}次多項式回帰"
         }
 
@@ -228,14 +182,10 @@ class Growth(commands.Cog):
         try:
             await interaction.response.defer(thinking=True)
 
-            # メンバーの参加日時を取得
-            join_dates = [
-                m.joined_at for m in interaction.guild.members
-                if m.joined_at
-            ]
-            join_dates.sort()
+            # メンバーの参加日時を取得（サーバーごとにキャッシュ済み）
+            join_timestamps = self.bot.join_series.get(interaction.guild)
 
-            if len(join_dates) < 2:
+            if len(join_timestamps) < 2:
                 await interaction.followup.send(
                     ERROR_MESSAGES["insufficient_data"]
                 )
@@ -247,9 +197,12 @@ class Growth(commands.Cog):
                 ephemeral=True
             )
 
-            # 予測の実行
-            predictor = GrowthPredictor(join_dates, target)
-            await self._show_progress(progress_message)
+            # 予測の実行（進捗表示と並行して学習）
+            predictor = GrowthPredictor(join_timestamps, target)
+            await asyncio.gather(
+                predictor.fit_model(self.bot.forecaster, interaction.guild_id),
+                self._show_progress(progress_message)
+            )
             target_date = predictor.predict_target_date()
 
             if not target_date:
@@ -262,20 +215,26 @@ class Growth(commands.Cog):
             embed = self._create_prediction_embed(
                 target,
                 target_date,
-                join_dates,
+                join_timestamps,
                 predictor.get_model_score(),
                 show_graph
             )
 
             if show_graph:
                 file = discord.File(
-                    predictor.create_prediction_plot(target_date),
+                    await self.bot.chart_renderer.render_growth(
+                        CHART_TEMPLATE,
+                        predictor.build_chart(target_date)
+                    ),
                     filename="growth_prediction.png"
                 )
                 await interaction.followup.send(embed=embed, file=file)
             else:
                 await interaction.followup.send(embed=embed)
 
+        except ForecastQueueFull:
+            await interaction.followup.send(ERROR_MESSAGES["busy"])
+
         except Exception as e:
             logger.error("Error in growth command: %s", e, exc_info=True)
             await interaction.followup.send(
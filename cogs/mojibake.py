@@ -1,4 +1,3 @@
-import re
 from typing import Final, List, Tuple, Optional
 import logging
 from datetime import datetime, timedelta
@@ -7,16 +6,11 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from lib.sanitizer import escape_mentions
 
 RATE_LIMIT_SECONDS: Final[int] = 10
 MAX_CONTENT_LENGTH: Final[int] = 2000
 
-MENTION_PATTERNS: Final[dict] = {
-    "everyone": r"@(everyone|here)",
-    "user": r"<@!?\d+>",
-    "role": r"<@&\d+>"
-}
-
 MOJIBAKE_PATTERNS: Final[List[Tuple[str, str]]] = [
     ("utf-8", "iso-8859-1"),
     ("utf-8", "shift_jis"),
@@ -53,18 +47,8 @@ class MojiBake(commands.Cog):
         return False, None
 
     def _sanitize_input(self, content: str) -> str:
-        # すべての@を全角に置き換え
-        sanitized = content.replace("@", "＠")
-
-        # 各種メンションパターンを無効化
-        for pattern in MENTION_PATTERNS.values():
-            sanitized = re.sub(
-                pattern,
-                lambda m: "＠" + m.group(0)[1:],
-                sanitized
-            )
-
-        return sanitized
+        # すべての@を全角に置き換え、各種メンションを無効化
+        return escape_mentions(content)
 
     def _create_mojibake(self, content: str) -> str:
         result = content
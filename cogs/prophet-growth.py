@@ -1,18 +1,19 @@
-import asyncio
-import io
 from datetime import datetime
-from typing import Final, Optional, List
+from typing import Final, Optional
 import logging
 
 import discord
 from discord.ext import commands
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from prophet import Prophet
+
+from lib.chart_renderer import ChartTemplate, GrowthChart
+from lib.forecast_executor import ForecastExecutor, ForecastQueueFull
+from lib.growth_models import fit_prophet
+from lib.growth_solver import first_crossing_index
+from lib.join_series import daily_cumulative, fingerprint, to_datetime, to_datetime64
 
 
-GRAPH_SIZE: Final[tuple] = (12, 8)
 PREDICTION_DAYS: Final[int] = 92  # 約3ヶ月
 MIN_DATA_POINTS: Final[int] = 2
 
@@ -27,24 +28,17 @@ PROPHET_CONFIG: Final[dict] = {
     }
 }
 
-GRAPH_SETTINGS: Final[dict] = {
-    "colors": {
-        "actual": "blue",
-        "prediction": "red",
-        "target": "green",
-        "date": "purple"
-    },
-    "alpha": 0.6,
-    "linewidth": 2,
-    "fontsize": {
-        "label": 14,
-        "title": 16
-    }
-}
+CHART_TEMPLATE: Final[ChartTemplate] = ChartTemplate(
+    figsize=(12, 8),
+    title="Server Growth Prediction with Prophet",
+    label_fontsize=14,
+    title_fontsize=16
+)
 
 ERROR_MESSAGES: Final[dict] = {
     "insufficient_data": "予測を行うためのデータが不足しています。",
     "no_target_reach": "予測範囲内でその目標値に到達しません。",
+    "busy": "現在予測処理が混み合っています。しばらくしてから再度お試しください。",
     "unexpected": "エラーが発生しました: {}"
 }
 
@@ -55,133 +49,54 @@ class GrowthPredictor:
 
     def __init__(
         self,
-        join_dates: List[datetime],
+        join_timestamps: np.ndarray,
         target: int
     ) -> None:
-        self.join_dates = join_dates
+        self.join_timestamps = join_timestamps
         self.target = target
-        self.df = self._prepare_data()
-
-    def _prepare_data(self) -> pd.DataFrame:
-        """データフレームを準備"""
-        return pd.DataFrame({
-            "ds": [d.strftime("%Y-%m-%d") for d in self.join_dates],
-            "y": np.arange(1, len(self.join_dates) + 1)
-        })
-
-    async def fit_model(self) -> Prophet:
-        self.df["ds"] = pd.to_datetime(self.df["ds"])
-        model = Prophet(
-            n_changepoints=PROPHET_CONFIG["n_changepoints"],
-            changepoint_prior_scale=PROPHET_CONFIG["changepoint_prior_scale"],
-            seasonality_mode=PROPHET_CONFIG["seasonality_mode"]
-        )
+        # 1メンバー1行ではなく日ごとの累積メンバー数を使い、入力をサーバーの日数に抑える
+        self.dates, self.daily_counts = daily_cumulative(join_timestamps)
 
-        weekly = PROPHET_CONFIG["weekly_seasonality"]
-        model.add_seasonality(
-            name=weekly["name"],
-            period=weekly["period"],
-            fourier_order=weekly["fourier_order"]
-        )
-
-        await asyncio.to_thread(model.fit, self.df)
-        return model
-
-    async def predict(
+    async def fit_predict(
         self,
-        model: Prophet
+        forecaster: ForecastExecutor,
+        guild_id: int
     ) -> pd.DataFrame:
-        future = model.make_future_dataframe(
-            periods=PREDICTION_DAYS
+        """モデルの学習と予測をワーカープロセスで実行（メンバーが変わっていなければキャッシュを再利用）"""
+        result = await forecaster.submit(
+            guild_id,
+            "prophet_daily",
+            fit_prophet,
+            self.dates,
+            self.daily_counts,
+            PROPHET_CONFIG,
+            PREDICTION_DAYS,
+            fingerprint=fingerprint(self.join_timestamps)
         )
-        return await asyncio.to_thread(model.predict, future)
+        return pd.DataFrame(result)
 
     def find_target_date(
         self,
         forecast: pd.DataFrame
     ) -> Optional[datetime]:
-        for _, row in forecast.iterrows():
-            if row["yhat"] >= self.target:
-                return row["ds"]
-        return None
-
-    async def generate_plot(
-        self,
-        forecast: pd.DataFrame,
-        target_date: datetime
-    ) -> io.BytesIO:
-        return await asyncio.to_thread(
-            self._generate_plot,
-            forecast,
-            target_date
-        )
+        index = first_crossing_index(forecast["yhat"].to_numpy(), self.target)
+        return forecast["ds"].iloc[index] if index is not None else None
 
-    def _generate_plot(
+    def build_chart(
         self,
         forecast: pd.DataFrame,
         target_date: datetime
-    ) -> io.BytesIO:
-        """グラフ生成の実装"""
-        plt.figure(figsize=GRAPH_SIZE)
-
-        # 実データのプロット
-        plt.scatter(
-            self.join_dates,
-            np.arange(1, len(self.join_dates) + 1),
-            color=GRAPH_SETTINGS["colors"]["actual"],
-            label="Actual Data",
-            alpha=GRAPH_SETTINGS["alpha"]
+    ) -> GrowthChart:
+        """グラフ描画用のデータを作成"""
+        return GrowthChart(
+            actual_x=to_datetime64(self.join_timestamps),
+            actual_y=np.arange(1, len(self.join_timestamps) + 1),
+            prediction_x=forecast["ds"].to_numpy(),
+            prediction_y=forecast["yhat"].to_numpy(),
+            target=self.target,
+            target_date=target_date
         )
 
-        # 予測線のプロット
-        plt.plot(
-            forecast["ds"],
-            forecast["yhat"],
-            color=GRAPH_SETTINGS["colors"]["prediction"],
-            label="Prediction",
-            linewidth=GRAPH_SETTINGS["linewidth"]
-        )
-
-        # 目標値と予測日の線
-        plt.axhline(
-            y=self.target,
-            color=GRAPH_SETTINGS["colors"]["target"],
-            linestyle="--",
-            label=f"Target: {self.target}",
-            linewidth=GRAPH_SETTINGS["linewidth"]
-        )
-        plt.axvline(
-            x=target_date,
-            color=GRAPH_SETTINGS["colors"]["date"],
-            linestyle="--",
-            label=f"Predicted: {target_date.date()}",
-            linewidth=GRAPH_SETTINGS["linewidth"]
-        )
-
-        # グラフの設定
-        plt.xlabel(
-            "Join Date",
-            fontsize=GRAPH_SETTINGS["fontsize"]["label"]
-        )
-        plt.ylabel(
-            "Member Count",
-            fontsize=GRAPH_SETTINGS["fontsize"]["label"]
-        )
-        plt.title(
-            "Server Growth Prediction with Prophet",
-            fontsize=GRAPH_SETTINGS["fontsize"]["title"]
-        )
-        plt.legend()
-        plt.grid(True, linestyle="--", alpha=GRAPH_SETTINGS["alpha"])
-
-        # 画像として保存
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", dpi=100, bbox_inches="tight")
-        buf.seek(0)
-        plt.close()
-
-        return buf
-
 class ProphetGrowth(commands.Cog):
     """Prophet成長予測機能を提供"""
 
@@ -192,7 +107,7 @@ class ProphetGrowth(commands.Cog):
         self,
         target: int,
         target_date: datetime,
-        join_dates: List[datetime],
+        join_timestamps: np.ndarray,
         show_graph: bool = True
     ) -> discord.Embed:
         """予測結果のEmbedを作成"""
@@ -206,9 +121,9 @@ class ProphetGrowth(commands.Cog):
             embed.set_image(url="attachment://prophet_growth_prediction.png")
 
         fields = {
-            "データポイント数": str(len(join_dates)),
-            "最初の参加日": join_dates[0].strftime("%Y-%m-%d"),
-            "最新の参加日": join_dates[-1].strftime("%Y-%m-%d"),
+            "データポイント数": str(len(join_timestamps)),
+            "最初の参加日": to_datetime(join_timestamps[0]).strftime("%Y-%m-%d"),
+            "最新の参加日": to_datetime(join_timestamps[-1]).strftime("%Y-%m-%d"),
             "予測モデル": "Prophet"
         }
 
@@ -240,14 +155,18 @@ class ProphetGrowth(commands.Cog):
         try:
             await interaction.response.defer(thinking=True)
 
-            # メンバーの参加日時を取得
-            join_dates = [
-                m.joined_at for m in interaction.guild.members
-                if m.joined_at
-            ]
-            join_dates.sort()
+            # メンバーの参加日時を取得（サーバーごとにキャッシュ済み）
+            join_timestamps = self.bot.join_series.get(interaction.guild)
 
-            if len(join_dates) < MIN_DATA_POINTS:
+            if len(join_timestamps) == 0:
+                await interaction.followup.send(
+                    ERROR_MESSAGES["insufficient_data"]
+                )
+                return
+
+            # 日ごとに集計した点数で判定（全員が同じ日に参加した場合は1点しかない）
+            predictor = GrowthPredictor(join_timestamps, target)
+            if len(predictor.daily_counts) < MIN_DATA_POINTS:
                 await interaction.followup.send(
                     ERROR_MESSAGES["insufficient_data"]
                 )
@@ -259,12 +178,12 @@ class ProphetGrowth(commands.Cog):
             )
 
             # 予測の実行
-            predictor = GrowthPredictor(join_dates, target)
-            model = await predictor.fit_model()
+            await progress.edit(content="データを処理中... 25%")
 
-            await progress.edit(content="データを処理中... 50%")
-
-            forecast = await predictor.predict(model)
+            forecast = await predictor.fit_predict(
+                self.bot.forecaster,
+                interaction.guild_id
+            )
             target_date = predictor.find_target_date(forecast)
 
             await progress.edit(content="データを処理中... 75%")
@@ -279,13 +198,16 @@ class ProphetGrowth(commands.Cog):
             embed = self._create_prediction_embed(
                 target,
                 target_date,
-                join_dates,
+                join_timestamps,
                 show_graph
             )
 
             if show_graph:
                 file = discord.File(
-                    await predictor.generate_plot(forecast, target_date),
+                    await self.bot.chart_renderer.render_growth(
+                        CHART_TEMPLATE,
+                        predictor.build_chart(forecast, target_date)
+                    ),
                     filename="prophet_growth_prediction.png"
                 )
                 await interaction.followup.send(
@@ -295,6 +217,9 @@ class ProphetGrowth(commands.Cog):
             else:
                 await progress.edit(content=None, embed=embed)
 
+        except ForecastQueueFull:
+            await interaction.followup.send(ERROR_MESSAGES["busy"])
+
         except Exception as e:
             logger.error("Error in prophet_growth: %s", e, exc_info=True)
             await interaction.followup.send(
@@ -1,14 +1,22 @@
 import discord
 from discord.ext import commands
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Optional
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, LukeConfig
-import torch
+
+from lib.sentiment import BACKENDS, SentimentBatcher, SentimentModelHost
+from lib.sentiment_cache import SentimentCache, normalize_text
 
 logger = logging.getLogger(__name__)
 
 RATE_LIMIT_SECONDS = 5
+# 最後の推論からモデルを解放するまでの秒数
+IDLE_UNLOAD_SECONDS = 600
+# モデルを別プロセスで実行する（解放時にプロセスごとメモリを返却できる）
+USE_SEPARATE_PROCESS = os.getenv("MIND_SEPARATE_PROCESS", "").lower() in ("1", "true", "yes")
+# 推論バックエンド（fp32 / int8 / onnx）
+MIND_BACKEND = os.getenv("MIND_BACKEND", "fp32").lower()
 ERROR_MESSAGES = {
     "rate_limit": "レート制限中です。{}秒後にお試しください。",
     "unexpected": "予期せぬエラーが発生しました: {}"
@@ -20,9 +28,19 @@ class Mind(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
         self._last_uses = {}
-        self.tokenizer = AutoTokenizer.from_pretrained("Mizuiro-sakura/luke-japanese-large-sentiment-analysis-wrime")
-        self.config = LukeConfig.from_pretrained("Mizuiro-sakura/luke-japanese-large-sentiment-analysis-wrime", output_hidden_states=True)
-        self.model = AutoModelForSequenceClassification.from_pretrained("Mizuiro-sakura/luke-japanese-large-sentiment-analysis-wrime", config=self.config)
+        # モデルは最初のsw!mindで読み込み、しばらく使われなければ解放する
+        self.batcher = SentimentBatcher(
+            SentimentModelHost(
+                idle_timeout=IDLE_UNLOAD_SECONDS,
+                use_process=USE_SEPARATE_PROCESS,
+                backend=MIND_BACKEND if MIND_BACKEND in BACKENDS else "fp32"
+            )
+        )
+        # 同じメッセージへの繰り返しのsw!mindは推論しない
+        self.cache = SentimentCache()
+
+    async def cog_unload(self) -> None:
+        await self.batcher.close()
 
     def _check_rate_limit(self, user_id: int) -> tuple[bool, Optional[int]]:
         now = datetime.now()
@@ -54,35 +72,14 @@ class Mind(commands.Cog):
                 referenced_message = ctx.message.reference.resolved
                 text = referenced_message.content
 
-                # テキストをトークン化
-                max_seq_length = 512
-                tokenized = self.tokenizer(text, truncation=True, max_length=max_seq_length, padding="max_length")
-                input_ids = torch.tensor(tokenized["input_ids"]).unsqueeze(0)  # バッチ次元追加
-                attention_mask = torch.tensor(tokenized["attention_mask"]).unsqueeze(0)
-
-                # モデル実行
-                output = self.model(input_ids, attention_mask=attention_mask)
-                max_index = torch.argmax(output.logits, dim=1).item()
-
-                # ラベルに対応する感情
-                if max_index == 0:
-                    sentiment_label = "うれしい"
-                elif max_index == 1:
-                    sentiment_label = "悲しい"
-                elif max_index == 2:
-                    sentiment_label = "期待"
-                elif max_index == 3:
-                    sentiment_label = "驚き"
-                elif max_index == 4:
-                    sentiment_label = "怒り"
-                elif max_index == 5:
-                    sentiment_label = "恐れ"
-                elif max_index == 6:
-                    sentiment_label = "嫌悪"
-                elif max_index == 7:
-                    sentiment_label = "信頼"
-                else:
-                    sentiment_label = "不明"
+                result = self.cache.get(text)
+                if result is None:
+                    # 同時に届いた他のリクエストとまとめて推論
+                    result = await self.batcher.classify(normalize_text(text))
+                    self.cache.put(text, result)
+                logger.debug("Sentiment cache stats: %s", self.cache.stats())
+                max_index = result.index
+                sentiment_label = result.label
 
                 # レート制限の更新
                 self._last_uses[ctx.author.id] = datetime.now()
@@ -1,143 +1,212 @@
 import asyncio
+import io
 import os
-import re
-import tempfile
-import uuid
-from typing import Final, Optional, Dict, List
+import queue
+import time
+from collections import deque
+from typing import Callable, Deque, Final, Optional, Dict, List, Set, Tuple, Union
+import json
 import logging
 from pathlib import Path
 from datetime import datetime, timedelta
-import sqlite3
 
+import aiosqlite
 import edge_tts
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from lib.reading_replacer import ReadingReplacer
+from lib.sanitizer import TTS_SANITIZER
+from lib.tts_cache import TTSAudioCache, cache_key
 
 VOICE: Final[str] = "ja-JP-NanamiNeural"
 MAX_MESSAGE_LENGTH: Final[int] = 75
 RATE_LIMIT_SECONDS: Final[int] = 10
 VOLUME_LEVEL: Final[float] = 0.6
-TEMP_DIR: Final[Path] = Path(tempfile.gettempdir()) / "voice_tts"
+PREFETCH_DEPTH: Final[int] = 3  # 再生中に先行して合成しておくメッセージ数
 DATABASE_PATH: Final[Path] = Path("data/dictionary.db")
-
-PATTERNS: Final[Dict[str, str]] = {
-    "url": r"http[s]?://[^\s<>]+",
-    "user_mention": r"<@!?[0-9]+>",
-    "role_mention": r"<@&[0-9]+>",
-    "channel_mention": r"<#[0-9]+>"
-}
+TTS_CACHE_DIR: Final[Path] = Path("data/tts_cache")
+GLOBAL_GUILD_ID: Final[int] = 0  # 全サーバー共通の単語
+SESSION_DB_PATH: Final[Path] = Path("data/voice_sessions.db")
+# 読み上げがないまま経過したら切断する秒数
+IDLE_TIMEOUT_SECONDS: Final[int] = int(os.getenv("VOICE_IDLE_TIMEOUT", "1800"))
+SUPERVISOR_INTERVAL_SECONDS: Final[int] = 30
+MAX_RECONNECT_ATTEMPTS: Final[int] = 3
+LATENCY_WINDOW: Final[int] = 20  # 平均合成時間の計算に使う直近の件数
+DICTIONARY_PAGE_SIZE: Final[int] = 10
 
 ERROR_MESSAGES: Final[dict] = {
     "not_in_voice": "先にボイスチャンネルに参加してください。",
     "bot_not_in_voice": "ボイスチャンネルに参加していません。",
     "rate_limit": "レート制限中です。{}秒後にお試しください。",
+    "word_not_found": "辞書に {} は登録されていません。",
+    "invalid_dictionary": "辞書ファイルは {\"単語\": \"読み\"} 形式のJSONにしてください。",
     "unexpected": "エラーが発生しました: {}"
 }
 
 SUCCESS_MESSAGES: Final[dict] = {
     "joined": "✅ {} に参加しました。",
+    "restored": "🔁 再起動前に参加していた {} に再接続しました。",
     "left": "👋 ボイスチャンネルから退出しました。",
     "tts_played": "📢 メッセージを読み上げました: {}"
 }
 
 logger = logging.getLogger(__name__)
 
-class TTSManager:
-    """TTSの管理を行うクラス"""
+class AudioStream(io.RawIOBase):
+    """合成中の音声チャンクを届いた順に読み出すストリーム
+
+    FFmpegPCMAudio(pipe=True)の書き込みスレッドから読まれるため、
+    readはチャンクが届くか合成が終わるまでブロックする。
+    """
 
     def __init__(self) -> None:
-        TEMP_DIR.mkdir(parents=True, exist_ok=True)
-        self.temp_files: List[str] = []
+        super().__init__()
+        self._chunks: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+        self._buffer = b""
+        self._finished = False
+        self.completed = False  # 合成が最後まで成功したか
+        self.task: Optional[asyncio.Task] = None  # このストリームに書き込む合成タスク
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.put(chunk)
+
+    def finish(self) -> None:
+        self._chunks.put(None)
+
+    def cancel(self) -> None:
+        """合成を取り消す（合成タスクが終了時にfinishを呼ぶため、readのブロックも解ける）
+
+        イベントループのスレッドから呼ぶこと。
+        """
+        if self.task is not None:
+            self.task.cancel()
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer:
+            if self._finished:
+                return b""
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._finished = True
+                return b""
+            self._buffer = chunk
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
 
-    def cleanup_temp_files(self) -> None:
-        """一時ファイルを削除"""
-        for file in self.temp_files.copy():
-            if os.path.exists(file):
-                try:
-                    os.remove(file)
-                    self.temp_files.remove(file)
-                except Exception as e:
-                    logger.error("Error removing temp file: %s", e, exc_info=True)
+class TTSManager:
+    """TTSの管理を行うクラス
+
+    edge-ttsの音声をファイルに保存せず、届いたチャンクから順にffmpegへ渡す。
+    """
 
-    async def generate_audio(
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _synthesize(
         self,
         message: str,
-        guild_id: int
-    ) -> Optional[str]:
+        stream: AudioStream,
+        on_first_chunk: Optional[Callable[[float], None]]
+    ) -> None:
+        start = time.perf_counter()
         try:
-            # guild_idとuuidをファイル名に含める
-            unique_id = uuid.uuid4().hex
-            temp_file = TEMP_DIR / f"{guild_id}_{unique_id}.mp3"
-            temp_path = str(temp_file)
-            self.temp_files.append(temp_path)
-
             tts = edge_tts.Communicate(message, VOICE)
-            await tts.save(temp_path)
-            return temp_path
-
+            async for chunk in tts.stream():
+                if chunk["type"] == "audio":
+                    if on_first_chunk is not None:
+                        on_first_chunk(time.perf_counter() - start)
+                        on_first_chunk = None
+                    stream.feed(chunk["data"])
+            stream.completed = True
         except Exception as e:
             logger.error("Error generating audio: %s", e, exc_info=True)
-            return None
-
-class DictionaryManager:
-    """辞書管理クラス"""
-
-    def __init__(self) -> None:
-        self.conn = sqlite3.connect(DATABASE_PATH)
-        self._create_table()
-
-    def _create_table(self) -> None:
-        with self.conn:
-            self.conn.execute(
-                "CREATE TABLE IF NOT EXISTS dictionary (word TEXT PRIMARY KEY, reading TEXT)"
-            )
-
-    def add_word(self, word: str, reading: str) -> None:
-        with self.conn:
-            self.conn.execute(
-                "INSERT OR REPLACE INTO dictionary (word, reading) VALUES (?, ?)",
-                (word, reading)
-            )
+        finally:
+            # 失敗・キャンセル時もffmpegへの入力を終わらせる
+            stream.finish()
 
-    def remove_word(self, word: str) -> None:
-        with self.conn:
-            self.conn.execute(
-                "DELETE FROM dictionary WHERE word = ?",
-                (word,)
-            )
-
-    def get_reading(self, word: str) -> Optional[str]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT reading FROM dictionary WHERE word = ?",
-            (word,)
-        )
-        result = cursor.fetchone()
-        return result[0] if result else None
-
-    def list_words(self, limit: int, offset: int) -> List[tuple]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT word, reading FROM dictionary LIMIT ? OFFSET ?",
-            (limit, offset)
-        )
-        return cursor.fetchall()
-
-    def close(self) -> None:
-        self.conn.close()
+    def stream_audio(
+        self,
+        message: str,
+        on_first_chunk: Optional[Callable[[float], None]] = None
+    ) -> AudioStream:
+        """
+        合成を開始し、その音声を読み出すストリームを返す
+
+        on_first_chunkには最初のチャンクが届くまでの秒数が渡される。
+        """
+        stream = AudioStream()
+        task = stream.task = asyncio.create_task(self._synthesize(message, stream, on_first_chunk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return stream
+
+    def cancel_all(self) -> None:
+        """実行中の合成をすべて取り消す"""
+        for task in self._tasks:
+            task.cancel()
+
+class RecordingAudio(discord.AudioSource):
+    """再生したPCMフレームを記録するAudioSource
+
+    合成が成功し最後まで再生できた場合のみ、記録したフレームをon_completeに渡す。
+    on_completeは音声送信スレッドから呼ばれる。
+    """
+
+    def __init__(
+        self,
+        original: discord.FFmpegPCMAudio,
+        stream: AudioStream,
+        on_complete: Callable[[List[bytes]], None]
+    ) -> None:
+        self.original = original
+        self.stream = stream
+        self.on_complete = on_complete
+        self._frames: List[bytes] = []
+        self._done = False
+
+    def read(self) -> bytes:
+        frame = self.original.read()
+        if frame:
+            self._frames.append(frame)
+        elif not self._done:
+            self._done = True
+            if self.stream.completed and self._frames:
+                self.on_complete(self._frames)
+        return frame
+
+    def cleanup(self) -> None:
+        self.original.cleanup()
+
+class CachedAudio(discord.AudioSource):
+    """キャッシュ済みのOpusパケットをそのまま送信するAudioSource"""
+
+    def __init__(self, packets: List[bytes]) -> None:
+        self._packets = iter(packets)
+
+    def read(self) -> bytes:
+        return next(self._packets, b"")
+
+    def is_opus(self) -> bool:
+        return True
+
+def encode_opus(frames: List[bytes]) -> List[bytes]:
+    """20msごとのPCMフレームをOpusパケットに変換"""
+    encoder = discord.opus.Encoder()
+    return [encoder.encode(frame, encoder.SAMPLES_PER_FRAME) for frame in frames]
 
 class MessageProcessor:
     """メッセージの処理を行うクラス"""
 
     @staticmethod
     def sanitize_message(text: str) -> str:
-        result = text
-        for pattern_name, pattern in PATTERNS.items():
-            if pattern_name == "url":
-                result = re.sub(pattern, "URL省略", result)
-            else:
-                result = re.sub(pattern, "メンション省略", result)
-        return result
+        return TTS_SANITIZER.sanitize(text)
 
     @staticmethod
     def limit_message(message: str) -> str:
@@ -149,15 +218,12 @@ class MessageProcessor:
     def process_message(
         message: str,
         attachments: List[discord.Attachment] = None,
-        dictionary: DictionaryManager = None
+        replacer: Optional[ReadingReplacer] = None
     ) -> str:
         result = MessageProcessor.sanitize_message(message)
         result = MessageProcessor.limit_message(result)
-        if dictionary:
-            for word in result.split():
-                reading = dictionary.get_reading(word)
-                if reading:
-                    result = result.replace(word, reading)
+        if replacer:
+            result = replacer.apply(result)
         if attachments:
             result += f" {len(attachments)}枚の画像"
         return result
@@ -169,95 +235,349 @@ class GuildTTS:
         self.channel_id = channel_id
         self.voice_client = voice_client
         self.text_channel_id = text_channel_id    # 追加: /joinが実行されたテキストチャンネルID
-        self.tts_queue: List[str] = []
-        self.lock = asyncio.Lock()
+        self.tts_queue: Deque[str] = deque()
+        # 合成を開始済みの音声（再生順）
+        self.prefetched: Deque[discord.AudioSource] = deque()
+        self.last_activity = time.monotonic()
+        self.reconnect_attempts = 0
+        self.synthesis_latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def queue_depth(self) -> int:
+        """読み上げ待ちのメッセージ数（先行合成中を含む）"""
+        return len(self.tts_queue) + len(self.prefetched)
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def record_latency(self, seconds: float) -> None:
+        self.synthesis_latencies.append(seconds)
+
+    def is_idle(self, timeout: float) -> bool:
+        return (
+            not self.voice_client.is_playing()
+            and self.queue_depth == 0
+            and time.monotonic() - self.last_activity > timeout
+        )
+
+    def metrics(self) -> Dict[str, Union[int, float, bool]]:
+        latencies = self.synthesis_latencies
+        return {
+            "connected": self.voice_client.is_connected(),
+            "queue_depth": self.queue_depth,
+            "synthesis_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "idle_seconds": time.monotonic() - self.last_activity,
+            "reconnect_attempts": self.reconnect_attempts
+        }
+
+    def clear(self) -> None:
+        """未再生のメッセージと先行合成中の音声を破棄"""
+        self.tts_queue.clear()
+        while self.prefetched:
+            source = self.prefetched.popleft()
+            # ffmpegを止めるだけでは合成が最後まで続くため、合成タスクも取り消す
+            if isinstance(source, RecordingAudio):
+                source.stream.cancel()
+            source.cleanup()
 
 class VoiceState:
-    """複数ギルド・複数チャンネルに対応した状態管理クラス"""
+    """複数ギルド・複数チャンネルに対応した状態管理クラス
+
+    再生中も次のPREFETCH_DEPTH件の合成とffmpegの起動を先に済ませておき、
+    前のメッセージが終わり次第すぐに次を再生する。
+    一度読み上げた内容はOpusパケットとしてキャッシュし、次回は合成も変換もせずに送信する。
+    """
 
     def __init__(self) -> None:
         self.guilds: Dict[int, GuildTTS] = {}
         self.tts_manager = TTSManager()
+        self.audio_cache = TTSAudioCache(cache_dir=TTS_CACHE_DIR)
+        self._store_tasks: Set[asyncio.Task] = set()
 
-    async def play_tts(
-        self,
-        guild_id: int,
-        message: str
-    ) -> None:
+    def remove_guild(self, guild_id: int) -> None:
+        guild_state = self.guilds.pop(guild_id, None)
+        if guild_state:
+            guild_state.clear()
+
+    @staticmethod
+    def _cache_key(message: str) -> str:
+        return cache_key(VOICE, message, VOLUME_LEVEL)
+
+    async def _store_audio(self, key: str, frames: List[bytes]) -> None:
+        try:
+            packets = await asyncio.to_thread(encode_opus, frames)
+            await self.audio_cache.store(key, packets)
+        except Exception as e:
+            logger.error("Error caching audio: %s", e, exc_info=True)
+
+    def _schedule_store(self, key: str, frames: List[bytes]) -> None:
+        task = asyncio.create_task(self._store_audio(key, frames))
+        self._store_tasks.add(task)
+        task.add_done_callback(self._store_tasks.discard)
+
+    def _create_source(self, message: str, guild_state: GuildTTS) -> discord.AudioSource:
+        key = self._cache_key(message)
+        if (packets := self.audio_cache.get(key)) is not None:
+            return CachedAudio(packets)
+
+        loop = asyncio.get_running_loop()
+        stream = self.tts_manager.stream_audio(message, guild_state.record_latency)
+        # 最初のチャンクが届き次第デコードを始める（入力形式を指定してプローブを省く）
+        source = discord.FFmpegPCMAudio(
+            stream,
+            pipe=True,
+            before_options="-f mp3",
+            options=f"-filter:a 'volume={VOLUME_LEVEL}'"
+        )
+        return RecordingAudio(
+            source,
+            stream,
+            lambda frames: loop.call_soon_threadsafe(self._schedule_store, key, frames)
+        )
+
+    def _prefetch(self, guild_state: GuildTTS) -> None:
+        while guild_state.tts_queue and len(guild_state.prefetched) < PREFETCH_DEPTH:
+            message = guild_state.tts_queue.popleft()
+            guild_state.prefetched.append(self._create_source(message, guild_state))
+
+    def _play_next(self, guild_id: int) -> None:
         guild_state = self.guilds.get(guild_id)
         if not guild_state:
             return
 
         voice_client = guild_state.voice_client
-        temp_path = await self.tts_manager.generate_audio(message, guild_id)
-        if not temp_path:
+        if not voice_client.is_connected() or voice_client.is_playing():
             return
 
+        self._prefetch(guild_state)
+        if not guild_state.prefetched:
+            return
+        source = guild_state.prefetched.popleft()
+        # 空いた枠で次のメッセージの合成を始める
+        self._prefetch(guild_state)
+
         def after_playing(error: Optional[Exception]) -> None:
             if error:
                 logger.error("Error playing audio: %s", error, exc_info=True)
-            async def play_next():
-                if voice_client.is_connected():
-                    async with guild_state.lock:
-                        if guild_state.tts_queue:
-                            next_message = guild_state.tts_queue.pop(0)
-                            await self.play_tts(guild_id, next_message)
-            asyncio.run_coroutine_threadsafe(play_next(), voice_client.loop)
-
-        voice_client.play(
-            discord.FFmpegPCMAudio(
-                temp_path,
-                options=f"-filter:a 'volume={VOLUME_LEVEL}'"
-            ),
-            after=after_playing
-        )
+            voice_client.loop.call_soon_threadsafe(self._play_next, guild_id)
 
-class DictionaryManager:
-    """辞書管理クラス"""
+        try:
+            voice_client.play(source, after=after_playing)
+        except Exception:
+            source.cleanup()
+            raise
+        guild_state.touch()
 
-    def __init__(self) -> None:
-        self.conn = sqlite3.connect(DATABASE_PATH)
-        self._create_table()
+    def resume(self, guild_id: int) -> None:
+        """再接続後に読み上げ待ちの再生を再開"""
+        self._play_next(guild_id)
 
-    def _create_table(self) -> None:
-        with self.conn:
-            self.conn.execute(
-                "CREATE TABLE IF NOT EXISTS dictionary (word TEXT PRIMARY KEY, reading TEXT)"
-            )
+    async def enqueue(
+        self,
+        guild_id: int,
+        message: str
+    ) -> None:
+        """メッセージを読み上げ待ちに追加し、再生中でなければ再生を始める"""
+        guild_state = self.guilds.get(guild_id)
+        if not guild_state:
+            return
 
-    def add_word(self, word: str, reading: str) -> None:
-        with self.conn:
-            self.conn.execute(
-                "INSERT OR REPLACE INTO dictionary (word, reading) VALUES (?, ?)",
-                (word, reading)
-            )
+        # 順番を保つため先に追加してから、ディスク上のキャッシュをメモリに載せる
+        guild_state.tts_queue.append(message)
+        guild_state.touch()
+        await self.audio_cache.load(self._cache_key(message))
+        if self.guilds.get(guild_id) is not guild_state:
+            return
 
-    def remove_word(self, word: str) -> None:
-        with self.conn:
-            self.conn.execute(
-                "DELETE FROM dictionary WHERE word = ?",
-                (word,)
-            )
+        self._prefetch(guild_state)
+        self._play_next(guild_id)
 
-    def get_reading(self, word: str) -> Optional[str]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT reading FROM dictionary WHERE word = ?",
-            (word,)
+class DictionaryManager:
+    """サーバーごとの読み辞書を管理するクラス
+
+    辞書はaiosqliteで保存する。読みの置換に使うReadingReplacerは
+    ボイスチャンネルに接続中のサーバーの分だけメモリに載せる。
+    以前の全サーバー共通の辞書はGLOBAL_GUILD_IDの単語として引き継ぎ、
+    各サーバーの辞書より優先度の低い既定値として扱う。
+    """
+
+    def __init__(self, db_path: Path = DATABASE_PATH) -> None:
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection: Optional[aiosqlite.Connection] = None
+        self._replacers: Dict[int, ReadingReplacer] = {}
+
+    async def initialize(self) -> None:
+        self._connection = await aiosqlite.connect(self.db_path)
+        await self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS guild_dictionary (
+                guild_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                reading TEXT NOT NULL,
+                PRIMARY KEY (guild_id, word)
+            ) WITHOUT ROWID
+        """)
+        await self._migrate_legacy_table()
+        await self._connection.commit()
+
+    async def _migrate_legacy_table(self) -> None:
+        async with self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dictionary'"
+        ) as cursor:
+            if await cursor.fetchone() is None:
+                return
+        await self._connection.execute(
+            """
+            INSERT OR IGNORE INTO guild_dictionary (guild_id, word, reading)
+            SELECT ?, word, reading FROM dictionary WHERE reading IS NOT NULL
+            """,
+            (GLOBAL_GUILD_ID,)
+        )
+        await self._connection.execute("DROP TABLE dictionary")
+        logger.info("Migrated legacy dictionary table to guild_dictionary")
+
+    async def close(self) -> None:
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+        self._replacers.clear()
+
+    async def _load(self, guild_id: int) -> ReadingReplacer:
+        # サーバーの単語が共通の単語を上書きするようにguild_idの昇順で読み込む
+        async with self._connection.execute(
+            """
+            SELECT word, reading FROM guild_dictionary
+            WHERE guild_id IN (?, ?)
+            ORDER BY guild_id = ?
+            """,
+            (GLOBAL_GUILD_ID, guild_id, guild_id)
+        ) as cursor:
+            replacer = ReadingReplacer(await cursor.fetchall())
+        self._replacers[guild_id] = replacer
+        return replacer
+
+    async def activate(self, guild_id: int) -> None:
+        """ボイスチャンネルへの接続時にサーバーの辞書をメモリに載せる"""
+        if guild_id not in self._replacers:
+            await self._load(guild_id)
+
+    def deactivate(self, guild_id: int) -> None:
+        """切断時にサーバーの辞書をメモリから外す"""
+        self._replacers.pop(guild_id, None)
+
+    def get_replacer(self, guild_id: int) -> Optional[ReadingReplacer]:
+        return self._replacers.get(guild_id)
+
+    async def add_word(self, guild_id: int, word: str, reading: str) -> None:
+        await self._connection.execute(
+            """
+            INSERT INTO guild_dictionary (guild_id, word, reading) VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, word) DO UPDATE SET reading = excluded.reading
+            """,
+            (guild_id, word, reading)
+        )
+        await self._connection.commit()
+        if (replacer := self._replacers.get(guild_id)) is not None:
+            replacer.set(word, reading)
+
+    async def remove_word(self, guild_id: int, word: str) -> bool:
+        cursor = await self._connection.execute(
+            "DELETE FROM guild_dictionary WHERE guild_id = ? AND word = ?",
+            (guild_id, word)
         )
-        result = cursor.fetchone()
-        return result[0] if result else None
-
-    def list_words(self, limit: int, offset: int) -> List[tuple]:
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT word, reading FROM dictionary LIMIT ? OFFSET ?",
-            (limit, offset)
+        await self._connection.commit()
+        removed = cursor.rowcount > 0
+        if removed and guild_id in self._replacers:
+            # 共通の辞書に同じ単語があればその読みに戻す
+            await self._load(guild_id)
+        return removed
+
+    async def list_words(self, guild_id: int, limit: int, offset: int) -> List[Tuple[str, str]]:
+        async with self._connection.execute(
+            """
+            SELECT word, reading FROM guild_dictionary
+            WHERE guild_id = ?
+            ORDER BY word
+            LIMIT ? OFFSET ?
+            """,
+            (guild_id, limit, offset)
+        ) as cursor:
+            return await cursor.fetchall()
+
+    async def import_words(self, guild_id: int, entries: Dict[str, str]) -> int:
+        """単語をまとめて追加（既存の単語は読みを上書き）"""
+        rows = [
+            (guild_id, word, reading)
+            for word, reading in entries.items()
+            if word and reading
+        ]
+        await self._connection.executemany(
+            """
+            INSERT INTO guild_dictionary (guild_id, word, reading) VALUES (?, ?, ?)
+            ON CONFLICT (guild_id, word) DO UPDATE SET reading = excluded.reading
+            """,
+            rows
         )
-        return cursor.fetchall()
+        await self._connection.commit()
+        if guild_id in self._replacers:
+            await self._load(guild_id)
+        return len(rows)
+
+    async def export_words(self, guild_id: int) -> Dict[str, str]:
+        async with self._connection.execute(
+            "SELECT word, reading FROM guild_dictionary WHERE guild_id = ? ORDER BY word",
+            (guild_id,)
+        ) as cursor:
+            return {word: reading async for word, reading in cursor}
+
+class VoiceSessionStore:
+    """接続中のボイスチャンネルを保存し、再起動後に再接続できるようにするクラス"""
+
+    def __init__(self, db_path: Path = SESSION_DB_PATH) -> None:
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection: Optional[aiosqlite.Connection] = None
+
+    async def initialize(self) -> None:
+        self._connection = await aiosqlite.connect(self.db_path)
+        await self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS voice_sessions (
+                guild_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                text_channel_id INTEGER NOT NULL
+            )
+        """)
+        await self._connection.commit()
+
+    async def close(self) -> None:
+        if self._connection:
+            await self._connection.close()
+            self._connection = None
+
+    async def save(self, guild_id: int, channel_id: int, text_channel_id: int) -> None:
+        await self._connection.execute(
+            """
+            INSERT INTO voice_sessions (guild_id, channel_id, text_channel_id) VALUES (?, ?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET
+                channel_id = excluded.channel_id,
+                text_channel_id = excluded.text_channel_id
+            """,
+            (guild_id, channel_id, text_channel_id)
+        )
+        await self._connection.commit()
 
-    def close(self) -> None:
-        self.conn.close()
+    async def delete(self, guild_id: int) -> None:
+        await self._connection.execute(
+            "DELETE FROM voice_sessions WHERE guild_id = ?",
+            (guild_id,)
+        )
+        await self._connection.commit()
+
+    async def load_all(self) -> List[Tuple[int, int, int]]:
+        async with self._connection.execute(
+            "SELECT guild_id, channel_id, text_channel_id FROM voice_sessions"
+        ) as cursor:
+            return await cursor.fetchall()
 
 class Voice(commands.Cog):
     """音声機能を提供"""
@@ -267,6 +587,118 @@ class Voice(commands.Cog):
         self.state = VoiceState()
         self._last_uses: Dict[int, datetime] = {}
         self.dictionary = DictionaryManager()
+        self.sessions = VoiceSessionStore()
+
+    async def cog_load(self) -> None:
+        await self.state.audio_cache.initialize()
+        await self.dictionary.initialize()
+        await self.sessions.initialize()
+        self.supervise.start()
+
+    async def _connect(
+        self,
+        channel: Union[discord.VoiceChannel, discord.StageChannel]
+    ) -> discord.VoiceClient:
+        """
+        ボイスチャンネルに接続（コグの再読み込み後などで既存の接続があれば引き継ぐ）
+
+        discord.pyが再接続中の接続は切断せずにそのまま返し、接続状態の確認は監視ループに任せる。
+        """
+        voice_client = channel.guild.voice_client
+        if voice_client:
+            if voice_client.is_connected() and voice_client.channel != channel:
+                await voice_client.move_to(channel)
+            return voice_client
+
+        voice_client = await channel.connect()
+        # ミュート状態に変更
+        await channel.guild.change_voice_state(channel=channel, self_deaf=True)
+        return voice_client
+
+    async def _end_session(self, guild_id: int) -> None:
+        """切断して状態を破棄し、再起動後の再接続対象からも外す"""
+        guild_state = self.state.guilds.get(guild_id)
+        if guild_state:
+            voice_client = guild_state.voice_client
+            if voice_client.is_connected():
+                await voice_client.disconnect()
+            elif voice_client.guild.voice_client is voice_client:
+                # 再接続中の接続も止める
+                await voice_client.disconnect(force=True)
+        self.state.remove_guild(guild_id)
+        self.dictionary.deactivate(guild_id)
+        await self.sessions.delete(guild_id)
+
+    async def _check_session(self, guild_id: int, guild_state: GuildTTS) -> None:
+        voice_client = guild_state.voice_client
+        if not voice_client.is_connected():
+            guild_state.reconnect_attempts += 1
+            if guild_state.reconnect_attempts > MAX_RECONNECT_ATTEMPTS:
+                logger.warning("Giving up reconnecting voice in guild %s", guild_id)
+                await self._end_session(guild_id)
+                return
+
+            guild = self.bot.get_guild(guild_id)
+            if guild and guild.voice_client is voice_client:
+                # discord.py自身が再接続中のため、次の確認まで待つ
+                logger.info("Waiting for voice reconnection in guild %s", guild_id)
+                return
+
+            channel = guild.get_channel(guild_state.channel_id) if guild else None
+            if channel is None:
+                await self._end_session(guild_id)
+                return
+            logger.info("Reconnecting voice in guild %s", guild_id)
+            guild_state.voice_client = await self._connect(channel)
+            self.state.resume(guild_id)
+            return
+
+        guild_state.reconnect_attempts = 0
+        alone = not any(not m.bot for m in voice_client.channel.members)
+        if alone or guild_state.is_idle(IDLE_TIMEOUT_SECONDS):
+            logger.info("Disconnecting idle voice session in guild %s", guild_id)
+            await self._end_session(guild_id)
+
+    @tasks.loop(seconds=SUPERVISOR_INTERVAL_SECONDS)
+    async def supervise(self) -> None:
+        """接続状態の確認・再接続と、使われていない接続の切断"""
+        for guild_id, guild_state in list(self.state.guilds.items()):
+            try:
+                await self._check_session(guild_id, guild_state)
+            except Exception as e:
+                logger.error("Error supervising voice in guild %s: %s", guild_id, e, exc_info=True)
+
+        # レート制限の記録が増え続けないようにする
+        expired = datetime.now() - timedelta(seconds=RATE_LIMIT_SECONDS)
+        for user_id in [u for u, t in self._last_uses.items() if t < expired]:
+            del self._last_uses[user_id]
+
+    @supervise.before_loop
+    async def restore_sessions(self) -> None:
+        """再起動前に接続していたボイスチャンネルに再接続"""
+        await self.bot.wait_until_ready()
+        for guild_id, channel_id, text_channel_id in await self.sessions.load_all():
+            guild = self.bot.get_guild(guild_id)
+            channel = guild.get_channel(channel_id) if guild else None
+            if channel is None or not any(not m.bot for m in channel.members):
+                await self.sessions.delete(guild_id)
+                continue
+
+            try:
+                voice_client = await self._connect(channel)
+            except Exception as e:
+                logger.error("Error restoring voice in guild %s: %s", guild_id, e, exc_info=True)
+                continue
+
+            self.state.guilds[guild_id] = GuildTTS(channel.id, voice_client, text_channel_id)
+            await self.dictionary.activate(guild_id)
+            logger.info("Restored voice session in guild %s", guild_id)
+            text_channel = guild.get_channel(text_channel_id)
+            if text_channel:
+                try:
+                    await text_channel.send(SUCCESS_MESSAGES["restored"].format(channel.name))
+                except discord.HTTPException:
+                    pass
 
     def _check_rate_limit(
         self,
@@ -310,16 +742,16 @@ class Voice(commands.Cog):
 
             if guild_id in self.state.guilds:
                 # 既存の場合はチャンネル移動とテキストチャンネル更新
-                await self.state.guilds[guild_id].voice_client.move_to(voice_channel)
-                self.state.guilds[guild_id].text_channel_id = interaction.channel.id  # 更新
+                guild_state = self.state.guilds[guild_id]
+                await guild_state.voice_client.move_to(voice_channel)
+                guild_state.channel_id = voice_channel.id
+                guild_state.text_channel_id = interaction.channel.id  # 更新
+                guild_state.touch()
             else:
-                voice_client = await voice_channel.connect()
-                # ミュート状態に変更
-                await voice_client.guild.change_voice_state(
-                    channel=voice_client.channel,
-                    self_deaf=True
-                )
+                voice_client = await self._connect(voice_channel)
                 self.state.guilds[guild_id] = GuildTTS(voice_channel.id, voice_client, interaction.channel.id)
+                await self.dictionary.activate(guild_id)
+            await self.sessions.save(guild_id, voice_channel.id, interaction.channel.id)
             self._last_uses[interaction.user.id] = datetime.now()
             await interaction.response.send_message(
                 SUCCESS_MESSAGES["joined"].format(voice_channel.name)
@@ -358,8 +790,6 @@ class Voice(commands.Cog):
                 )
                 return
 
-            voice_client = self.state.guilds[guild_id].voice_client
-
             is_limited, remaining = self._check_rate_limit(interaction.user.id)
             if is_limited:
                 await interaction.response.send_message(
@@ -368,8 +798,7 @@ class Voice(commands.Cog):
                 )
                 return
 
-            await voice_client.disconnect()
-            del self.state.guilds[guild_id]
+            await self._end_session(guild_id)
             self._last_uses[interaction.user.id] = datetime.now()
 
             await interaction.response.send_message(SUCCESS_MESSAGES["left"])
@@ -415,13 +844,11 @@ class Voice(commands.Cog):
                 )
                 return
 
-            processed_message = MessageProcessor.process_message(message, dictionary=self.dictionary)
-            guild_state = self.state.guilds[guild_id]
-            async with guild_state.lock:
-                guild_state.tts_queue.append(processed_message)
-                if not guild_state.voice_client.is_playing():
-                    next_message = guild_state.tts_queue.pop(0)
-                    await self.state.play_tts(guild_id, next_message)
+            processed_message = MessageProcessor.process_message(
+                message,
+                replacer=self.dictionary.get_replacer(guild_id)
+            )
+            await self.state.enqueue(guild_id, processed_message)
 
             self._last_uses[interaction.user.id] = datetime.now()
             await interaction.response.send_message(
@@ -435,10 +862,53 @@ class Voice(commands.Cog):
                 ephemeral=True
             )
 
+    @discord.app_commands.command(
+        name="vc-status",
+        description="読み上げの接続状態を表示します"
+    )
+    @discord.app_commands.guild_only()
+    async def vc_status(
+        self,
+        interaction: discord.Interaction
+    ) -> None:
+        try:
+            guild_state = self.state.guilds.get(interaction.guild.id)
+            if not guild_state:
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["bot_not_in_voice"],
+                    ephemeral=True
+                )
+                return
+
+            metrics = guild_state.metrics()
+            embed = discord.Embed(
+                title="読み上げの状態",
+                color=discord.Color.blue() if metrics["connected"] else discord.Color.orange()
+            )
+            embed.add_field(name="接続", value="接続中" if metrics["connected"] else "再接続中")
+            embed.add_field(name="読み上げ待ち", value=f"{metrics['queue_depth']}件")
+            embed.add_field(
+                name="平均合成時間",
+                value=f"{metrics['synthesis_latency'] * 1000:.0f}ms"
+            )
+            embed.add_field(
+                name="最後の読み上げ",
+                value=f"{int(metrics['idle_seconds'])}秒前"
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            logger.error("Error in vc_status command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
     @discord.app_commands.command(
         name="dictionary_add",
         description="辞書に単語を追加します"
     )
+    @discord.app_commands.guild_only()
     async def dictionary_add(
         self,
         interaction: discord.Interaction,
@@ -446,7 +916,7 @@ class Voice(commands.Cog):
         reading: str
     ) -> None:
         try:
-            self.dictionary.add_word(word, reading)
+            await self.dictionary.add_word(interaction.guild.id, word, reading)
             embed = discord.Embed(
                 title="辞書に追加しました",
                 description=f"✅ {word} -> {reading}",
@@ -466,13 +936,19 @@ class Voice(commands.Cog):
         name="dictionary_remove",
         description="辞書から単語を削除します"
     )
+    @discord.app_commands.guild_only()
     async def dictionary_remove(
         self,
         interaction: discord.Interaction,
         word: str
     ) -> None:
         try:
-            self.dictionary.remove_word(word)
+            if not await self.dictionary.remove_word(interaction.guild.id, word):
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["word_not_found"].format(word),
+                    ephemeral=True
+                )
+                return
             embed = discord.Embed(
                 title="辞書から削除しました",
                 description=f"✅ {word}",
@@ -492,15 +968,19 @@ class Voice(commands.Cog):
         name="dictionary_list",
         description="辞書の単語をリストします"
     )
+    @discord.app_commands.guild_only()
     async def dictionary_list(
         self,
         interaction: discord.Interaction,
         page: int = 1
     ) -> None:
         try:
-            limit = 10
-            offset = (page - 1) * limit
-            words = self.dictionary.list_words(limit, offset)
+            offset = (max(page, 1) - 1) * DICTIONARY_PAGE_SIZE
+            words = await self.dictionary.list_words(
+                interaction.guild.id,
+                DICTIONARY_PAGE_SIZE,
+                offset
+            )
             if not words:
                 await interaction.response.send_message("辞書に単語がありません。", ephemeral=True)
                 return
@@ -523,6 +1003,75 @@ class Voice(commands.Cog):
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @discord.app_commands.command(
+        name="dictionary_export",
+        description="このサーバーの辞書をJSONファイルで出力します"
+    )
+    @discord.app_commands.guild_only()
+    async def dictionary_export(
+        self,
+        interaction: discord.Interaction
+    ) -> None:
+        try:
+            words = await self.dictionary.export_words(interaction.guild.id)
+            if not words:
+                await interaction.response.send_message("辞書に単語がありません。", ephemeral=True)
+                return
+
+            data = json.dumps(words, ensure_ascii=False, indent=2).encode()
+            await interaction.response.send_message(
+                f"📖 {len(words)}件の単語を出力しました。",
+                file=discord.File(fp=io.BytesIO(data), filename="dictionary.json")
+            )
+
+        except Exception as e:
+            logger.error("Error in dictionary_export command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
+    @discord.app_commands.command(
+        name="dictionary_import",
+        description="JSONファイルから辞書に単語をまとめて追加します"
+    )
+    @discord.app_commands.guild_only()
+    @discord.app_commands.checks.has_permissions(manage_guild=True)
+    async def dictionary_import(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment
+    ) -> None:
+        try:
+            try:
+                entries = json.loads(await file.read())
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                entries = None
+            if not isinstance(entries, dict) or not all(
+                isinstance(word, str) and isinstance(reading, str)
+                for word, reading in entries.items()
+            ):
+                await interaction.response.send_message(
+                    ERROR_MESSAGES["invalid_dictionary"],
+                    ephemeral=True
+                )
+                return
+
+            count = await self.dictionary.import_words(interaction.guild.id, entries)
+            embed = discord.Embed(
+                title="辞書に追加しました",
+                description=f"✅ {count}件の単語を追加しました",
+                color=discord.Color.green()
+            )
+            await interaction.response.send_message(embed=embed)
+
+        except Exception as e:
+            logger.error("Error in dictionary_import command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                ERROR_MESSAGES["unexpected"].format(str(e)),
+                ephemeral=True
+            )
+
     @commands.Cog.listener()
     async def on_message(
         self,
@@ -541,13 +1090,9 @@ class Voice(commands.Cog):
             processed_message = MessageProcessor.process_message(
                 message.content,
                 message.attachments,
-                self.dictionary
+                self.dictionary.get_replacer(guild.id)
             )
-            async with guild_state.lock:
-                guild_state.tts_queue.append(processed_message)
-                if not guild_state.voice_client.is_playing():
-                    next_message = guild_state.tts_queue.pop(0)
-                    await self.state.play_tts(guild.id, next_message)
+            await self.state.enqueue(guild.id, processed_message)
 
         except Exception as e:
             logger.error("Error in message handler: %s", e, exc_info=True)
@@ -566,10 +1111,19 @@ class Voice(commands.Cog):
                 return
 
             voice_client = guild_state.voice_client
+            # ボット自身が切断された場合はセッションを終了し、移動させられた場合は再接続先を更新
+            if member.id == self.bot.user.id:
+                if after.channel is None:
+                    logger.info("Bot was disconnected from voice in guild %s", guild.id)
+                    await self._end_session(guild.id)
+                elif after.channel.id != guild_state.channel_id:
+                    guild_state.channel_id = after.channel.id
+                    await self.sessions.save(guild.id, after.channel.id, guild_state.text_channel_id)
+                return
+
             # ボットのみになった場合は切断
             if voice_client and len(voice_client.channel.members) == 1:
-                await voice_client.disconnect()
-                del self.state.guilds[guild.id]
+                await self._end_session(guild.id)
                 return
 
             # 参加・退出時にTTSを再生
@@ -580,22 +1134,25 @@ class Voice(commands.Cog):
             else:
                 return
 
-            processed_message = MessageProcessor.process_message(msg, dictionary=self.dictionary)
-            async with guild_state.lock:
-                guild_state.tts_queue.append(processed_message)
-                if not voice_client.is_playing():
-                    next_message = guild_state.tts_queue.pop(0)
-                    await self.state.play_tts(guild.id, next_message)
+            processed_message = MessageProcessor.process_message(
+                msg,
+                replacer=self.dictionary.get_replacer(guild.id)
+            )
+            await self.state.enqueue(guild.id, processed_message)
 
         except Exception as e:
             logger.error("Error in voice state update: %s", e, exc_info=True)
 
     async def cog_unload(self) -> None:
-        self.state.tts_manager.cleanup_temp_files()
+        self.supervise.cancel()
+        self.state.tts_manager.cancel_all()
+        # 保存した接続先は残し、次回の読み込み時に再接続する
         for guild_state in self.state.guilds.values():
+            guild_state.clear()
             if guild_state.voice_client.is_connected():
                 await guild_state.voice_client.disconnect()
-        self.dictionary.close()
+        await self.dictionary.close()
+        await self.sessions.close()
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Voice(bot))
@@ -1,7 +1,6 @@
 import asyncio
-import re
 from functools import lru_cache
-from typing import Final, Optional, List, Tuple, Dict
+from typing import Final, Optional, List, Tuple
 import logging
 from datetime import datetime, timedelta
 
@@ -12,6 +11,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from lib.sanitizer import escape_mentions
+
 
 WIKIPEDIA_LANG: Final[str] = "ja"
 CACHE_SIZE: Final[int] = 100
@@ -20,11 +21,6 @@ DISAMBIGUATION_LIMIT: Final[int] = 5
 SUMMARY_SENTENCES: Final[int] = 3
 RATE_LIMIT_SECONDS: Final[int] = 10
 
-PATTERNS: Final[Dict[str, str]] = {
-    "mention": r"@",
-    "everyone_here": r"@(everyone|here)"
-}
-
 ERROR_MESSAGES: Final[dict] = {
     "no_results": "**'{}'** に該当する結果はありませんでした。",
     "page_not_found": "**'{}'** に該当するページが見つかりませんでした。",
@@ -75,12 +71,8 @@ class MessageProcessor:
 
     @staticmethod
     def sanitize_input(content: str) -> str:
-        result = content
-        # メンションを全角に変換
-        result = re.sub(PATTERNS["mention"], "＠", result)
-        # @everyone, @hereを無効化
-        result = re.sub(PATTERNS["everyone_here"], "＠\\1", result)
-        return result
+        # メンション・@everyone・@hereを全角の＠で無効化
+        return escape_mentions(content)
 
 class WikipediaCog(commands.Cog):
     """Wikipedia検索機能を提供"""
@@ -0,0 +1,153 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Final, NamedTuple, Optional, Tuple
+
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+DEFAULT_MAX_WORKERS: Final[int] = 2
+# 実データの点はこれを超える場合に間引く（累積曲線なので見た目はほぼ変わらない）
+MAX_ACTUAL_POINTS: Final[int] = 2000
+
+CHART_COLORS: Final[dict] = {
+    "actual": "blue",
+    "prediction": "red",
+    "target": "green",
+    "date": "purple"
+}
+
+class ChartTemplate(NamedTuple):
+    """グラフの見た目の設定（ワーカースレッドごとに図を作り置きする単位）"""
+
+    figsize: Tuple[int, int]
+    title: str
+    xlabel: str = "Join Date"
+    ylabel: str = "Member Count"
+    label_fontsize: Optional[int] = None
+    title_fontsize: Optional[int] = None
+    alpha: float = 0.6
+    grid_alpha: float = 0.6
+    linewidth: float = 2
+    dpi: int = 100
+
+class GrowthChart(NamedTuple):
+    """成長予測グラフに描画するデータ"""
+
+    actual_x: Any
+    actual_y: Any
+    prediction_x: Any
+    prediction_y: Any
+    target: int
+    target_date: datetime
+
+class ChartRenderer:
+    """成長予測グラフを描画するクラス
+
+    pyplotのグローバルな状態を使わず、Figure/Aggキャンバスをワーカースレッドで描画する。
+    図はテンプレートごと・スレッドごとに作り置きし、描画のたびに中身だけを差し替える。
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="chart-renderer"
+        )
+        self._local = threading.local()
+
+    def _get_axes(self, template: ChartTemplate) -> Tuple[Figure, Axes]:
+        figures: Dict[ChartTemplate, Tuple[Figure, Axes]] = getattr(
+            self._local, "figures", None
+        ) or {}
+        self._local.figures = figures
+
+        if template not in figures:
+            fig = Figure(figsize=template.figsize, dpi=template.dpi)
+            FigureCanvasAgg(fig)
+            figures[template] = (fig, fig.add_subplot())
+        return figures[template]
+
+    @staticmethod
+    def _apply_style(ax: Axes, template: ChartTemplate) -> None:
+        ax.set_xlabel(template.xlabel, fontsize=template.label_fontsize)
+        ax.set_ylabel(template.ylabel, fontsize=template.label_fontsize)
+        ax.set_title(template.title, fontsize=template.title_fontsize)
+        ax.grid(True, linestyle="--", alpha=template.grid_alpha)
+
+    def _render_growth(
+        self,
+        template: ChartTemplate,
+        chart: GrowthChart
+    ) -> io.BytesIO:
+        fig, ax = self._get_axes(template)
+        ax.clear()
+
+        actual_x = np.asarray(chart.actual_x)
+        actual_y = np.asarray(chart.actual_y)
+        if len(actual_x) > MAX_ACTUAL_POINTS:
+            indices = np.linspace(0, len(actual_x) - 1, MAX_ACTUAL_POINTS).astype(np.int64)
+            actual_x, actual_y = actual_x[indices], actual_y[indices]
+
+        # 実データ（scatterではなくマーカーのみの線で描画した方が速い）
+        ax.plot(
+            actual_x,
+            actual_y,
+            linestyle="none",
+            marker="o",
+            markersize=6,
+            color=CHART_COLORS["actual"],
+            label="Actual Data",
+            alpha=template.alpha
+        )
+        ax.plot(
+            chart.prediction_x,
+            chart.prediction_y,
+            color=CHART_COLORS["prediction"],
+            label="Prediction",
+            linewidth=template.linewidth
+        )
+
+        # 目標値と予測日の線
+        ax.axhline(
+            y=chart.target,
+            color=CHART_COLORS["target"],
+            linestyle="--",
+            label=f"Target: {chart.target}",
+            linewidth=template.linewidth
+        )
+        ax.axvline(
+            x=chart.target_date,
+            color=CHART_COLORS["date"],
+            linestyle="--",
+            label=f"Predicted: {chart.target_date.date()}",
+            linewidth=template.linewidth
+        )
+
+        self._apply_style(ax, template)
+        ax.legend()
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=template.dpi, bbox_inches="tight")
+        buf.seek(0)
+        return buf
+
+    async def render_growth(
+        self,
+        template: ChartTemplate,
+        chart: GrowthChart
+    ) -> io.BytesIO:
+        """成長予測グラフをPNGとして描画"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self._render_growth,
+            template,
+            chart
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Final, Optional, Set, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_BYTES: Final[int] = 64 * 1024 * 1024
+FINGERPRINT_KEY: Final[str] = "_fingerprint"
+
+ForecastKey = Tuple[int, str, Tuple[int, ...]]
+ForecastResult = Dict[str, np.ndarray]
+
+logger = logging.getLogger(__name__)
+
+class ForecastCache:
+    """学習済みモデルのパラメータと予測結果のキャッシュ
+
+    キーは(サーバーID, モデルの種類, メンバー数と最終参加日時のフィンガープリント)。
+    メモリ上ではサイズ上限付きのLRUで保持し、cache_dirを指定した場合は
+    サーバー・モデルごとに1ファイルへ保存して再起動後も再利用する。
+    ディスクへの書き込み・削除はバックグラウンドで登録順に実行し、呼び出し元を待たせない。
+    返した配列は呼び出し元で共有されるため書き換えないこと。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        cache_dir: Optional[Path] = None
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[ForecastKey, ForecastResult]" = OrderedDict()
+        self._size = 0
+        self._disk_lock = asyncio.Lock()
+        self._disk_tasks: Set[asyncio.Task] = set()
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _nbytes(value: ForecastResult) -> int:
+        return sum(array.nbytes for array in value.values())
+
+    def _path(self, key: ForecastKey) -> Path:
+        guild_id, kind, _ = key
+        return self.cache_dir / f"{guild_id}-{kind}.npz"
+
+    def get(self, key: ForecastKey) -> Optional[ForecastResult]:
+        """メモリ上のキャッシュを参照"""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: ForecastKey, value: ForecastResult) -> None:
+        """メモリ上のキャッシュに追加し、上限を超えた分を古い順に破棄"""
+        if (old := self._entries.pop(key, None)) is not None:
+            self._size -= self._nbytes(old)
+
+        # 同じサーバー・モデルの古いフィンガープリントは不要
+        for stale in [k for k in self._entries if k[:2] == key[:2]]:
+            self._size -= self._nbytes(self._entries.pop(stale))
+
+        self._entries[key] = value
+        self._size += self._nbytes(value)
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._nbytes(evicted)
+
+    def _read_file(self, key: ForecastKey) -> Optional[ForecastResult]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if not np.array_equal(data[FINGERPRINT_KEY], np.asarray(key[2])):
+                return None
+            return {name: data[name] for name in data.files if name != FINGERPRINT_KEY}
+
+    def _write_file(self, key: ForecastKey, value: ForecastResult) -> None:
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **value, **{FINGERPRINT_KEY: np.asarray(key[2])})
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    async def load(self, key: ForecastKey) -> Optional[ForecastResult]:
+        """メモリ、ディスクの順にキャッシュを参照"""
+        if (value := self.get(key)) is not None or self.cache_dir is None:
+            return value
+
+        try:
+            value = await asyncio.to_thread(self._read_file, key)
+        except Exception as e:
+            logger.warning("Failed to read forecast cache %s: %s", key, e)
+            return None
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def _schedule_disk(self, description: str, func: Callable[[], None]) -> None:
+        async def run() -> None:
+            # 書き込みと削除が前後しないよう1つずつ実行
+            async with self._disk_lock:
+                try:
+                    await asyncio.to_thread(func)
+                except Exception as e:
+                    logger.warning("Failed to %s: %s", description, e)
+
+        task = asyncio.create_task(run())
+        self._disk_tasks.add(task)
+        task.add_done_callback(self._disk_tasks.discard)
+
+    def store(self, key: ForecastKey, value: ForecastResult) -> None:
+        """キャッシュに保存（ディスクへの書き込みはバックグラウンドで実行）"""
+        self.put(key, value)
+        if self.cache_dir is not None:
+            self._schedule_disk(
+                f"write forecast cache {key}",
+                lambda: self._write_file(key, value)
+            )
+
+    def _remove_files(self, guild_id: int) -> None:
+        for path in self.cache_dir.glob(f"{guild_id}-*.npz"):
+            path.unlink(missing_ok=True)
+
+    def drop_guild(self, guild_id: int) -> None:
+        """サーバーのキャッシュを破棄（ファイルの削除はバックグラウンドで実行）"""
+        for key in [k for k in self._entries if k[0] == guild_id]:
+            self._size -= self._nbytes(self._entries.pop(key))
+        if self.cache_dir is not None:
+            self._schedule_disk(
+                f"remove forecast cache of guild {guild_id}",
+                lambda: self._remove_files(guild_id)
+            )
+
+    async def flush(self) -> None:
+        """バックグラウンドのディスク操作が終わるまで待機"""
+        while self._disk_tasks:
+            await asyncio.gather(*self._disk_tasks)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Final, Hashable, Optional, Tuple
+
+from lib.forecast_cache import ForecastCache
+
+DEFAULT_MAX_WORKERS: Final[int] = 2
+DEFAULT_MAX_PENDING: Final[int] = 8
+
+logger = logging.getLogger(__name__)
+
+class ForecastQueueFull(Exception):
+    """待ち行列が上限に達している場合に送出"""
+
+class _ForecastJob:
+    """実行中のジョブと、その結果を待っている呼び出し元の数"""
+
+    def __init__(self, future: asyncio.Future) -> None:
+        self.future = future
+        self.waiters = 0
+
+class ForecastExecutor:
+    """成長予測モデルの学習をプロセスプールで実行するクラス
+
+    同じサーバー・同じモデル・同じデータへの同時リクエストは1つのジョブにまとめる。
+    cacheを指定した場合、フィンガープリント付きのジョブの結果を保存して再利用する。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        cache: Optional[ForecastCache] = None
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.cache = cache
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[Tuple[int, str, Hashable], _ForecastJob] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """実行中および待機中のジョブ数"""
+        return len(self._jobs)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # ボット本体のスレッドを引き継がないようにspawnで起動
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _start(
+        self,
+        key: Tuple[int, str, Hashable],
+        func: Callable[..., Any],
+        args: Tuple[Any, ...]
+    ) -> _ForecastJob:
+        if len(self._jobs) >= self.max_pending:
+            raise ForecastQueueFull()
+
+        try:
+            concurrent_future = self._get_pool().submit(func, *args)
+        except BrokenProcessPool:
+            logger.warning("Forecast process pool was broken; recreating")
+            self._pool = None
+            concurrent_future = self._get_pool().submit(func, *args)
+
+        job = _ForecastJob(
+            asyncio.ensure_future(self._run(key, asyncio.wrap_future(concurrent_future)))
+        )
+        self._jobs[key] = job
+        job.future.add_done_callback(lambda _: self._jobs.pop(key, None))
+        return job
+
+    async def _run(
+        self,
+        key: Tuple[int, str, Hashable],
+        future: asyncio.Future
+    ) -> Any:
+        result = await future
+        if self.cache is not None and key[2] is not None:
+            self.cache.store(key, result)
+        return result
+
+    async def submit(
+        self,
+        guild_id: int,
+        kind: str,
+        func: Callable[..., Any],
+        *args: Any,
+        fingerprint: Hashable = None
+    ) -> Any:
+        """
+        ジョブを投入して結果を待つ
+
+        Parameters
+        ----------
+        guild_id : int
+            サーバーID
+        kind : str
+            モデルの種類
+        func : Callable[..., Any]
+            ワーカープロセスで実行する関数（モジュールのトップレベルに定義されたもの）
+        fingerprint : Hashable, optional
+            入力データを識別する値。同じ値のジョブは1つにまとめられ、
+            キャッシュがあればその結果を返す
+        """
+        key = (guild_id, kind, fingerprint)
+        if self.cache is not None and fingerprint is not None:
+            if (cached := await self.cache.load(key)) is not None:
+                return cached
+
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._start(key, func, args)
+
+        job.waiters += 1
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            # 最後の待機者がキャンセルした場合のみジョブ自体を取り消す
+            if job.waiters == 1 and not job.future.done():
+                job.future.cancel()
+            raise
+        finally:
+            job.waiters -= 1
+
+    def cancel_guild(self, guild_id: int) -> int:
+        """指定したサーバーの未完了ジョブを取り消し、キャッシュを破棄"""
+        cancelled = 0
+        for (job_guild_id, _, _), job in list(self._jobs.items()):
+            if job_guild_id == guild_id and job.future.cancel():
+                cancelled += 1
+        if self.cache is not None:
+            self.cache.drop_guild(guild_id)
+        return cancelled
+
+    def shutdown(self) -> None:
+        """プロセスプールを停止"""
+        for job in list(self._jobs.values()):
+            job.future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,93 @@
+"""成長予測モデルの学習処理
+
+ForecastExecutorのワーカープロセスで実行されるため、
+引数と戻り値はpickle可能なものに限る。
+戻り値はForecastCacheに保存できるよう、NumPy配列の辞書とする。
+statsmodelsとprophetは読み込みが重いため、使用する関数の中でimportする。
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import PolynomialFeatures
+
+
+def fit_polynomial(
+    ordinals: np.ndarray,
+    y: np.ndarray,
+    degree: int
+) -> Dict[str, np.ndarray]:
+    """多項式回帰モデルを学習し、次数の低い順の係数と決定係数を返す"""
+    X = ordinals.reshape(-1, 1)
+    poly = PolynomialFeatures(degree=degree)
+    X_poly = poly.fit_transform(X)
+    model = LinearRegression()
+    model.fit(X_poly, y)
+
+    coefficients = np.zeros(degree + 1)
+    for power, coef in zip(poly.powers_[:, 0], model.coef_):
+        coefficients[power] += coef
+    coefficients[0] += model.intercept_
+    return {
+        "coefficients": coefficients,
+        "score": np.asarray(model.score(X_poly, y))
+    }
+
+
+def fit_arima(
+    y: np.ndarray,
+    possible_orders: List[Tuple[int, int, int]],
+    steps: int
+) -> Dict[str, np.ndarray]:
+    """AICが最小となる次数でARIMAを学習し、次数・AIC・予測値を返す"""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    best_order = possible_orders[0]
+    best_fit = None
+    for order in possible_orders:
+        try:
+            fit = ARIMA(y, order=order).fit()
+        except Exception:
+            continue
+        if best_fit is None or fit.aic < best_fit.aic:
+            best_order, best_fit = order, fit
+
+    if best_fit is None:
+        best_fit = ARIMA(y, order=best_order).fit()
+
+    return {
+        "order": np.asarray(best_order),
+        "aic": np.asarray(best_fit.aic),
+        "predictions": np.asarray(best_fit.forecast(steps=steps))
+    }
+
+
+def fit_prophet(
+    ds: np.ndarray,
+    y: np.ndarray,
+    config: Dict[str, Any],
+    periods: int
+) -> Dict[str, np.ndarray]:
+    """Prophetを学習し、予測結果の日付(ds)と予測値(yhat)を返す"""
+    from prophet import Prophet
+
+    model = Prophet(
+        n_changepoints=config["n_changepoints"],
+        changepoint_prior_scale=config["changepoint_prior_scale"],
+        seasonality_mode=config["seasonality_mode"]
+    )
+    weekly = config["weekly_seasonality"]
+    model.add_seasonality(
+        name=weekly["name"],
+        period=weekly["period"],
+        fourier_order=weekly["fourier_order"]
+    )
+    model.fit(pd.DataFrame({"ds": pd.to_datetime(ds), "y": y}))
+
+    future = model.make_future_dataframe(periods=periods)
+    forecast = model.predict(future)
+    return {
+        "ds": forecast["ds"].to_numpy(dtype="datetime64[ns]"),
+        "yhat": forecast["yhat"].to_numpy()
+    }
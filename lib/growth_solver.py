@@ -0,0 +1,60 @@
+"""成長予測で目標値に到達する時点を求める処理
+
+予測値を1日ずつ走査する代わりに、多項式は根から、
+予測系列は配列演算で最初に目標値を超える位置を求める。
+"""
+from typing import Final, Optional
+
+import numpy as np
+from numpy.polynomial import Polynomial
+
+ROOT_IMAG_TOLERANCE: Final[float] = 1e-7
+
+
+def first_crossing_index(
+    values: np.ndarray,
+    target: float
+) -> Optional[int]:
+    """valuesが初めてtarget以上になる位置を返す（到達しなければNone）"""
+    reached = np.asarray(values) >= target
+    if not reached.any():
+        return None
+    return int(np.argmax(reached))
+
+
+def first_polynomial_crossing(
+    coefficients: np.ndarray,
+    start: int,
+    horizon: int,
+    target: float
+) -> Optional[int]:
+    """
+    多項式が[start, start + horizon)の整数点で初めてtarget以上になる点を返す
+
+    Parameters
+    ----------
+    coefficients : np.ndarray
+        次数の低い順に並べた多項式の係数
+    start : int
+        探索を始める点
+    horizon : int
+        探索する点の数
+    target : float
+        目標値
+    """
+    # 日付の序数は大きいため、startを原点にずらしてから根を求める
+    shifted = Polynomial(coefficients)(Polynomial([start, 1]))
+    if shifted(0) >= target:
+        return start
+
+    roots = (shifted - target).roots()
+    tolerance = ROOT_IMAG_TOLERANCE * np.maximum(1.0, np.abs(roots))
+    real_roots = roots[np.abs(roots.imag) <= tolerance].real
+    real_roots = np.sort(real_roots[(real_roots > 0) & (real_roots < horizon)])
+
+    for root in real_roots:
+        # 根がちょうど整数の場合の丸め誤差に備えて翌日も確認
+        for offset in np.ceil(root) + np.array([0.0, 1.0]):
+            if offset < horizon and shifted(offset) >= target:
+                return start + int(offset)
+    return None
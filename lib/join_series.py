@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from typing import Dict, Final, Optional, Tuple
+
+import discord
+import numpy as np
+
+# 1970-01-01のdatetime.toordinal()
+EPOCH_ORDINAL: Final[int] = 719163
+SECONDS_PER_DAY: Final[int] = 24 * 60 * 60
+
+
+def to_ordinals(timestamps: np.ndarray) -> np.ndarray:
+    """UNIX秒をdatetime.toordinal()と同じ日単位の序数に変換"""
+    return timestamps // SECONDS_PER_DAY + EPOCH_ORDINAL
+
+
+def to_datetime64(timestamps: np.ndarray) -> np.ndarray:
+    """UNIX秒をグラフ描画用のdatetime64配列に変換"""
+    return timestamps.astype("datetime64[s]")
+
+
+def ordinals_to_datetime64(ordinals: np.ndarray) -> np.ndarray:
+    """日単位の序数をdatetime64[D]配列に変換"""
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def to_datetime(timestamp: np.int64) -> datetime:
+    """UNIX秒をUTCのdatetimeに変換"""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def daily_cumulative(timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    参加日時を日ごとの累積メンバー数に集計
+
+    モデルへの入力をメンバー数ではなくサーバーの日数に比例させるために使う。
+    参加者のいない日も含め、最初の参加日から最後の参加日までを1日1点で返す。
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        日付(datetime64[D])と、その日の終わり時点の累積メンバー数
+    """
+    days = timestamps // SECONDS_PER_DAY
+    counts = np.bincount(days - days[0])
+    dates = np.arange(days[0], days[0] + len(counts)).astype("datetime64[D]")
+    return dates, np.cumsum(counts)
+
+
+def fingerprint(timestamps: np.ndarray) -> Tuple[int, int]:
+    """メンバー数と最終参加日時から、予測結果の再利用可否を判定する値を作成"""
+    return len(timestamps), int(timestamps[-1]) if len(timestamps) else 0
+
+
+class JoinSeriesCache:
+    """サーバーごとのメンバー参加日時（UNIX秒, 昇順）をキャッシュするクラス
+
+    初回参照時にメンバー一覧から一度だけ構築し、以降は参加・退出イベントで差分更新する。
+    配列は更新のたびに新しく作り直すため、参照中の予測処理に影響しない。
+    """
+
+    def __init__(self) -> None:
+        self._series: Dict[int, np.ndarray] = {}
+
+    def get(self, guild: discord.Guild) -> np.ndarray:
+        """参加日時の配列を取得（未構築なら構築）"""
+        series = self._series.get(guild.id)
+        if series is None:
+            series = np.fromiter(
+                (int(m.joined_at.timestamp()) for m in guild.members if m.joined_at),
+                dtype=np.int64
+            )
+            series.sort()
+            self._series[guild.id] = series
+        return series
+
+    @staticmethod
+    def _timestamp(member: discord.Member) -> Optional[int]:
+        return int(member.joined_at.timestamp()) if member.joined_at else None
+
+    def add(self, member: discord.Member) -> None:
+        series = self._series.get(member.guild.id)
+        timestamp = self._timestamp(member)
+        if series is None or timestamp is None:
+            return
+
+        if not len(series) or timestamp >= series[-1]:
+            # 新規参加はほぼ常に末尾になる
+            self._series[member.guild.id] = np.append(series, timestamp)
+        else:
+            index = np.searchsorted(series, timestamp)
+            self._series[member.guild.id] = np.insert(series, index, timestamp)
+
+    def remove(self, member: discord.Member) -> None:
+        series = self._series.get(member.guild.id)
+        timestamp = self._timestamp(member)
+        if series is None or timestamp is None:
+            return
+
+        index = np.searchsorted(series, timestamp)
+        if index < len(series) and series[index] == timestamp:
+            self._series[member.guild.id] = np.delete(series, index)
+
+    def drop_guild(self, guild_id: int) -> None:
+        self._series.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._series.clear()
@@ -1,5 +1,5 @@
 import os
-import textwrap
+import re
 import random
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 from PIL.Image import Resampling
@@ -8,6 +8,11 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 import numpy as np
 
+# 改行位置の単位: 空白、空白を含まない英数字などの単語、かな・漢字・全角文字は1文字ずつ
+LINE_BREAK_TOKEN_PATTERN = re.compile(r"\s+|[^\s\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]+|.")
+# 行頭に置かない約物（1行につき1文字まで前の行の末尾にぶら下げる）
+NO_BREAK_BEFORE = frozenset("、。，．,.!?！？」』）)]】〉》ー〜ゃゅょっぁぃぅぇぉャュョッァィゥェォ")
+
 
 class MakeItQuote:
     def __init__(self, fonts_dir: str = None, backgrounds_dir: str = None):
@@ -66,9 +71,15 @@ class MakeItQuote:
 
         # Initialize cache
         self._font_cache = {}
-        self._gradient_cache = {}
+        self._advance_cache = {}
         self._background_cache = {}
 
+        # Precomputed render assets (reused across requests, never modified in place)
+        self._overlay_cache = {}
+        self._watermark_cache = {}
+        self._template_cache = {}
+        self._mask_cache = {}
+
     @lru_cache(maxsize=32)
     def _get_random_background(self) -> str:
         """Get a random background image path"""
@@ -91,46 +102,109 @@ class MakeItQuote:
         except Exception as e:
             raise ValueError(f"フォントの取得中にエラーが発生しました: {e}") from e
 
-    def _wrap_text(self, text: str, width: int) -> List[str]:
-        """Wrap text to fit specified width"""
+    def _get_advances(self, font_path: str, size: int) -> Dict[str, float]:
+        """Get the glyph advance cache for (font, size)"""
+        key = (font_path, size)
+        if key not in self._advance_cache:
+            self._advance_cache[key] = {}
+        return self._advance_cache[key]
+
+    def _measure(self, text: str, font_path: str, size: int) -> float:
+        """Measure text width in pixels as the sum of cached glyph advances"""
+        advances = self._get_advances(font_path, size)
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self._get_font(font_path, size).getlength(char)
+            width += advance
+        return width
+
+    def _wrap_text(self, text: str, font_path: str, size: int, max_width: int) -> List[str]:
+        """Wrap text to fit max_width pixels (words are kept together, CJK breaks between characters)"""
         try:
-            return textwrap.wrap(text, width=width)
+            lines = []
+            line = ""
+            line_width = 0.0
+            hanging = False
+            for token in LINE_BREAK_TOKEN_PATTERN.findall(text):
+                if token.isspace():
+                    if line:
+                        line += " "
+                        line_width += self._measure(" ", font_path, size)
+                    continue
+
+                token_width = self._measure(token, font_path, size)
+                if line and line_width + token_width > max_width:
+                    if not hanging and token in NO_BREAK_BEFORE:
+                        # ぶら下げは1文字だけ。次の文字からは改行する
+                        line += token
+                        line_width += token_width
+                        hanging = True
+                        continue
+                    lines.append(line.rstrip())
+                    line, line_width = "", 0.0
+                hanging = False
+
+                if not line and token_width > max_width and len(token) > 1:
+                    # 1行に収まらない長い単語は文字単位で分割
+                    for char in token:
+                        char_width = self._measure(char, font_path, size)
+                        if line and line_width + char_width > max_width:
+                            lines.append(line)
+                            line, line_width = "", 0.0
+                        line += char
+                        line_width += char_width
+                    continue
+
+                line += token
+                line_width += token_width
+
+            if line.strip():
+                lines.append(line.rstrip())
+            return lines
         except Exception as e:
             raise ValueError(f"テキストの折り返し処理中にエラーが発生しました: {e}") from e
 
-    def _add_text_with_effects_parallel(self,
-                                    draw: ImageDraw,
-                                    position: Tuple[int, int],
-                                    text: str,
-                                    font: ImageFont,
-                                    text_color: Tuple[int, int, int],
-                                    shadow_color: Tuple[int, int, int, int],
-                                    shadow_strength: int = 3):
-        """Add text with enhanced shadow and outline effects using parallel processing"""
+    def _add_text_with_effects(self,
+                               layer: Image.Image,
+                               position: Tuple[int, int],
+                               text: str,
+                               font: ImageFont,
+                               text_color: Tuple[int, int, int],
+                               shadow_color: Tuple[int, int, int, int],
+                               shadow_strength: int = 3):
+        """Add text with a drop shadow and a 1px outline onto an RGBA layer
+
+        The shadow is a single rasterized text mask, blurred and offset by shadow_strength,
+        and the outline is drawn together with the text using stroke_width.
+        """
         try:
-            x, y = position
-
-            def draw_shadow(offset):
-                draw.text((x + offset[0], y + offset[1]), text, font=font, fill=shadow_color)
-
-            def draw_outline(pos):
-                offset_x, offset_y = pos
-                draw.text((x + offset_x, y + offset_y), text, font=font, fill=(0, 0, 0, 255))
-
-            # Create shadow positions
-            shadow_offsets = [(i, i) for i in range(1, shadow_strength + 1)]
-            outline_positions = [(i, j) for i in range(-1, 2) for j in range(-1, 2) if i != 0 or j != 0]
-
-            # Execute shadow and outline drawing in parallel
-            shadow_futures = [self.executor.submit(draw_shadow, offset) for offset in shadow_offsets]
-            outline_futures = [self.executor.submit(draw_outline, pos) for pos in outline_positions]
-
-            # Wait for all effects to complete
-            for future in shadow_futures + outline_futures:
-                future.result()
+            draw = ImageDraw.Draw(layer)
+
+            # 影はテキスト周辺の領域だけでマスクを1回描画し、ぼかしてずらす
+            margin = shadow_strength * 2 + 2
+            left, top, right, bottom = draw.textbbox(position, text, font=font, stroke_width=1)
+            origin = (left - margin, top - margin)
+            size = (right - left + margin * 2, bottom - top + margin * 2)
+
+            mask = Image.new("L", size, 0)
+            ImageDraw.Draw(mask).text(
+                (position[0] - origin[0], position[1] - origin[1]),
+                text, font=font, fill=shadow_color[3], stroke_width=1
+            )
+            mask = mask.filter(ImageFilter.GaussianBlur(radius=shadow_strength / 2))
+
+            shadow = Image.new("RGBA", size, shadow_color[:3] + (0,))
+            shadow.putalpha(mask)
+            layer.alpha_composite(
+                shadow,
+                (max(origin[0] + shadow_strength, 0), max(origin[1] + shadow_strength, 0)),
+                (max(-origin[0] - shadow_strength, 0), max(-origin[1] - shadow_strength, 0))
+            )
 
-            # Draw main text
-            draw.text(position, text, font=font, fill=text_color)
+            # Draw main text with outline
+            draw.text(position, text, font=font, fill=text_color, stroke_width=1, stroke_fill=(0, 0, 0, 255))
         except Exception as e:
             raise ValueError(f"テキスト効果の描画中にエラーが発生しました: {e}") from e
 
@@ -162,49 +236,74 @@ class MakeItQuote:
         except Exception as e:
             raise ValueError(f"グラデーションの生成中にエラーが発生しました: {e}") from e
 
-    def _enhance_background_parallel(self, background: Image.Image, style: Dict) -> Image.Image:
-        """Apply enhancements to the background image in parallel"""
+    def _enhance_background(self, background: Image.Image, output_size: Tuple[int, int]) -> Image.Image:
+        """Resize, enhance and blur the background image (the only avatar-dependent work)"""
         try:
-            def apply_enhancements():
-                enhanced = ImageEnhance.Contrast(background).enhance(1.2)
-                enhanced = ImageEnhance.Brightness(enhanced).enhance(0.85)
-                enhanced = ImageEnhance.Color(enhanced).enhance(1.3)
-                return enhanced
-
-            def apply_blur(img):
-                return img.filter(ImageFilter.GaussianBlur(radius=3))
-
-            # Execute enhancements and blur in parallel
-            enhanced_future = self.executor.submit(apply_enhancements)
-
-            # Get enhanced image
-            background = enhanced_future.result()
-
-            # Apply blur
-            background = apply_blur(background)
-
-            # Create overlay
-            overlay_opacity = style.get("overlay_opacity", 160)
-            overlay = Image.new("RGBA", background.size, (0, 0, 0, overlay_opacity))
-            background = Image.alpha_composite(background.convert("RGBA"), overlay)
-
-            if style.get("gradient_overlay", False):
-                # Get or create gradient overlay
-                gradient_key = (background.size, "vertical")
-                if gradient_key not in self._gradient_cache:
-                    self._gradient_cache[gradient_key] = self._create_gradient_overlay(
-                        background.size,
-                        (0, 0, 0, 0),
-                        (0, 0, 0, 180),
-                        "vertical"
-                    )
-                gradient = self._gradient_cache[gradient_key]
-                background = Image.alpha_composite(background, gradient)
+            background = background.convert("RGBA")
 
-            return background
+            # 元画像の方が小さければ補正は画素数の少ない元の解像度で行う
+            if background.width * background.height < output_size[0] * output_size[1]:
+                background = self._apply_enhancements(background).resize(output_size, Resampling.LANCZOS)
+            else:
+                background = self._apply_enhancements(background.resize(output_size, Resampling.LANCZOS))
+
+            return background.filter(ImageFilter.GaussianBlur(radius=3))
         except Exception as e:
             raise ValueError(f"背景画像の処理中にエラーが発生しました: {e}") from e
 
+    @staticmethod
+    def _apply_enhancements(image: Image.Image) -> Image.Image:
+        enhanced = ImageEnhance.Contrast(image).enhance(1.2)
+        enhanced = ImageEnhance.Brightness(enhanced).enhance(0.85)
+        return ImageEnhance.Color(enhanced).enhance(1.3)
+
+    def _get_overlay_layer(self, size: Tuple[int, int], style: Dict) -> Image.Image:
+        """Get cached darkening overlay (with gradient) for the style"""
+        overlay_opacity = style.get("overlay_opacity", 160)
+        gradient_overlay = style.get("gradient_overlay", False)
+        key = (size, overlay_opacity, gradient_overlay)
+        if key not in self._overlay_cache:
+            overlay = Image.new("RGBA", size, (0, 0, 0, overlay_opacity))
+            if gradient_overlay:
+                gradient = self._create_gradient_overlay(size, (0, 0, 0, 0), (0, 0, 0, 180), "vertical")
+                overlay = Image.alpha_composite(overlay, gradient)
+            self._overlay_cache[key] = overlay
+        return self._overlay_cache[key]
+
+    def _get_watermark_layer(self, size: Tuple[int, int], font_path: str, font_size: int) -> Image.Image:
+        """Get cached transparent layer containing the credit text"""
+        try:
+            credit_font_size = max(font_size // 5, 12)
+            key = (size, font_path, credit_font_size)
+            if key not in self._watermark_cache:
+                width, height = size
+                layer = Image.new("RGBA", size, (0, 0, 0, 0))
+                credit_font = self._get_font(font_path, credit_font_size)
+                credit_text = "Powered by Swiftly"
+                credit_width = credit_font.getbbox(credit_text)[2]
+                credit_position = (width - credit_width - 20, height - credit_font_size - 20)
+                self._add_text_with_effects(
+                    layer, credit_position, credit_text,
+                    credit_font, (200, 200, 200), (0, 0, 0, 150), 1
+                )
+                self._watermark_cache[key] = layer
+            return self._watermark_cache[key]
+        except Exception as e:
+            raise ValueError(f"ウォーターマークの描画中にエラーが発生しました: {e}") from e
+
+    def _get_template(self, size: Tuple[int, int], style: Dict, font_path: str, font_size: int) -> Image.Image:
+        """Get cached overlay and watermark pre-composited into a single layer"""
+        key = (
+            size, style.get("overlay_opacity", 160), style.get("gradient_overlay", False),
+            font_path, max(font_size // 5, 12)
+        )
+        if key not in self._template_cache:
+            self._template_cache[key] = Image.alpha_composite(
+                self._get_overlay_layer(size, style),
+                self._get_watermark_layer(size, font_path, font_size)
+            )
+        return self._template_cache[key]
+
     def _get_font(self, font_path: str, size: int) -> ImageFont.FreeTypeFont:
         """Get cached font object"""
         try:
@@ -215,31 +314,35 @@ class MakeItQuote:
         except Exception as e:
             raise ValueError(f"フォントの読み込み中にエラーが発生しました: {e}") from e
 
-    def _apply_rounded_corners(self, image: Image.Image, radius: int = 40) -> Image.Image:
-        """Apply rounded corners to an image"""
-        try:
+    def _get_rounded_mask(self, size: Tuple[int, int], radius: int) -> Image.Image:
+        """Get cached alpha mask with rounded corners"""
+        key = (size, radius)
+        if key not in self._mask_cache:
             circle = Image.new("L", (radius * 2, radius * 2), 0)
             draw = ImageDraw.Draw(circle)
             draw.ellipse((0, 0, radius * 2, radius * 2), fill=255)
 
-            width, height = image.size
-            alpha = Image.new("L", image.size, 255)
+            width, height = size
+            alpha = Image.new("L", size, 255)
 
             # Paste corner circles
             alpha.paste(circle.crop((0, 0, radius, radius)), (0, 0))
             alpha.paste(circle.crop((radius, 0, radius * 2, radius)), (width - radius, 0))
             alpha.paste(circle.crop((0, radius, radius, radius * 2)), (0, height - radius))
             alpha.paste(circle.crop((radius, radius, radius * 2, radius * 2)), (width - radius, height - radius))
+            self._mask_cache[key] = alpha
+        return self._mask_cache[key]
 
+    def _apply_rounded_corners(self, image: Image.Image, radius: int = 40) -> Image.Image:
+        """Apply rounded corners to an image (RGBA images are modified in place)"""
+        try:
             # Convert image to RGBA if it"s not already
             if image.mode != "RGBA":
                 image = image.convert("RGBA")
 
             # Apply the alpha mask
-            result = image.copy()
-            result.putalpha(alpha)
-
-            return result
+            image.putalpha(self._get_rounded_mask(image.size, radius))
+            return image
         except Exception as e:
             raise ValueError(f"角丸処理中にエラーが発生しました: {e}") from e
 
@@ -248,24 +351,29 @@ class MakeItQuote:
         try:
             # 最小フォントサイズを設定
             min_font_size = 20
-            current_size = initial_size
-
-            while current_size > min_font_size:
-                font = self._get_font(font_path, current_size)
-                # テキストを折り返して各行の幅をチェック
-                wrapped_text = self._wrap_text(text, width=(max_width - 100) // max(1, font.getbbox("A")[2]))
-
-                # 全体の高さを計算
-                total_height = len(wrapped_text) * (current_size + 10)
-
-                # 最大幅と高さをチェック
-                max_line_width = max(font.getbbox(line)[2] for line in wrapped_text)
 
-                if max_line_width <= max_width - 100 and total_height <= max_height * 0.7:
-                    return current_size
+            def fits(size: int) -> bool:
+                wrapped_text = self._wrap_text(text, font_path, size, max_width - 100)
+                if len(wrapped_text) * (size + 10) > max_height * 0.7:
+                    return False
+                # 各行が最大幅に収まるか確認（行末にぶら下げた1文字は余白にはみ出してよい）
+                return all(
+                    self._measure(line[:-1] if line[-1] in NO_BREAK_BEFORE else line, font_path, size)
+                    <= max_width - 100
+                    for line in wrapped_text
+                )
 
-                current_size -= 5
-            return min_font_size
+            # 収まる最大のサイズを二分探索
+            low, high = min_font_size, initial_size
+            if high <= low or fits(high):
+                return max(high, low)
+            while high - low > 1:
+                mid = (low + high) // 2
+                if fits(mid):
+                    low = mid
+                else:
+                    high = mid
+            return low
         except Exception as e:
             raise ValueError(f"フォントサイズの計算中にエラーが発生しました: {e}") from e
 
@@ -299,14 +407,11 @@ class MakeItQuote:
                     background_path = self._get_random_background()
                     try:
                         bg = Image.open(background_path)
-                        bg = bg.convert("RGBA")
-                        bg = bg.resize(output_size, Resampling.LANCZOS)
                     except Exception as e:
                         raise ValueError(f"背景画像の読み込み中にエラーが発生しました: {e}") from e
                 else:
-                    bg = background_image.convert("RGBA")
-                    bg = bg.resize(output_size, Resampling.LANCZOS)
-                return self._enhance_background_parallel(bg, style_settings)
+                    bg = background_image
+                return self._enhance_background(bg, output_size)
 
             # Calculate optimal font size if not provided
             if font_size is None:
@@ -337,70 +442,52 @@ class MakeItQuote:
 
             # Create a separate transparent layer for text drawing
             text_layer = Image.new("RGBA", background.size, (0, 0, 0, 0))
-            text_draw = ImageDraw.Draw(text_layer)
 
             # Process quote text
-            wrapped_quote = self._wrap_text(quote, width=(width - 100) // max(1, quote_font.getbbox("A")[2]))
+            wrapped_quote = self._wrap_text(quote, font_path, font_size, width - 100)
             total_quote_height = len(wrapped_quote) * (font_size + 10)
 
             # Add quote marks
             quote_mark_size = int(font_size * 2.5)
             quote_mark_position = (width // 8, height // 6)
-            self._add_text_with_effects_parallel(
-                text_draw, quote_mark_position, '"',
+            self._add_text_with_effects(
+                text_layer, quote_mark_position, '"',
                 self._get_font(font_path, quote_mark_size),
                 text_color, shadow_color
             )
 
-            # Draw quote text lines on text_layer in parallel
+            # Draw quote text lines on text_layer
             start_y = max((height - total_quote_height) // 2, height // 3)
-            def draw_text_line(line_data):
+            for i, line in enumerate(wrapped_quote):
                 try:
-                    line, y_pos = line_data
                     text_width = quote_font.getbbox(line)[2]
-                    position = ((width - text_width) // 2, y_pos)
-                    self._add_text_with_effects_parallel(
-                        text_draw, position, line, quote_font,
+                    position = ((width - text_width) // 2, start_y + i * (font_size + 10))
+                    self._add_text_with_effects(
+                        text_layer, position, line, quote_font,
                         text_color, shadow_color,
                         shadow_strength=style_settings.get("shadow_strength", 2)
                     )
                 except Exception as e:
                     raise ValueError(f"テキスト描画中にエラーが発生しました: {e}") from e
 
-            text_lines = [(line, start_y + i * (font_size + 10)) for i, line in enumerate(wrapped_quote)]
-            text_futures = [self.executor.submit(draw_text_line, line_data) for line_data in text_lines]
-            for future in text_futures:
-                future.result()
-
             # Add author text on text_layer if provided
             if author:
                 try:
                     author_text = f"— {author}"
                     author_width = author_font.getbbox(author_text)[2]
                     author_position = ((width - author_width) // 2, start_y + len(wrapped_quote) * (font_size + 10) + 30)
-                    self._add_text_with_effects_parallel(
-                        text_draw, author_position, author_text,
+                    self._add_text_with_effects(
+                        text_layer, author_position, author_text,
                         author_font, text_color, shadow_color
                     )
                 except Exception as e:
                     raise ValueError(f"著者名の描画中にエラーが発生しました: {e}") from e
 
-            # Add watermark on text_layer
-            try:
-                credit_font_size = max(font_size // 5, 12)
-                credit_font = self._get_font(font_path, credit_font_size)
-                credit_text = "Powered by Swiftly"
-                credit_width = credit_font.getbbox(credit_text)[2]
-                credit_position = (width - credit_width - 20, height - credit_font_size - 20)
-                self._add_text_with_effects_parallel(
-                    text_draw, credit_position, credit_text,
-                    credit_font, (200, 200, 200), (0, 0, 0, 150), 1
-                )
-            except Exception as e:
-                raise ValueError(f"ウォーターマークの描画中にエラーが発生しました: {e}") from e
-
-            # Composite the text_layer onto the background
-            background = Image.alpha_composite(background, text_layer)
+            # Composite the cached overlay + watermark, then only the region of text_layer that has text
+            background.alpha_composite(self._get_template(output_size, style_settings, font_path, font_size))
+            text_box = text_layer.getbbox()
+            if text_box:
+                background.alpha_composite(text_layer, text_box[:2], text_box)
 
             # Apply rounded corners if specified
             if style_settings.get("rounded_corners", False):
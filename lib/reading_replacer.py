@@ -0,0 +1,66 @@
+import re
+from typing import Dict, Iterable, Optional, Pattern, Tuple
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    単語のトライを正規表現に変換
+
+    共通の接頭辞をまとめるため、単語数が増えても1文字あたりの分岐は少ない。
+    終端の後ろを貪欲な省略可能グループにすることで、同じ位置からは最長の単語に一致する。
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class ReadingReplacer:
+    """辞書の単語を読みに置き換えるクラス
+
+    全単語から1つの正規表現を作り、メッセージを1回走査するだけで置換する。
+    空白で区切られていない日本語や、複数語からなる単語にも一致する。
+    単語の追加・削除時は次の置換時に正規表現を作り直す。
+    """
+
+    def __init__(self, readings: Iterable[Tuple[str, str]] = ()) -> None:
+        self._readings: Dict[str, str] = {}
+        self._pattern: Optional[Pattern[str]] = None
+        for word, reading in readings:
+            self.set(word, reading)
+
+    def __len__(self) -> int:
+        return len(self._readings)
+
+    def set(self, word: str, reading: str) -> None:
+        if not word or self._readings.get(word) == reading:
+            return
+        if word not in self._readings:
+            self._pattern = None
+        self._readings[word] = reading
+
+    def remove(self, word: str) -> None:
+        if self._readings.pop(word, None) is not None:
+            self._pattern = None
+
+    def apply(self, text: str) -> str:
+        if not self._readings:
+            return text
+        if self._pattern is None:
+            self._pattern = re.compile(_trie_pattern(self._readings))
+        return self._pattern.sub(lambda m: self._readings[m.group(0)], text)
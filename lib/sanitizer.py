@@ -0,0 +1,52 @@
+import re
+from typing import Dict, Final, Pattern, Tuple
+
+# 読み上げで省略するURL・メンション（ユーザー・ロール・チャンネル）
+TTS_PATTERNS: Final[Dict[str, str]] = {
+    "url": r"http[s]?://[^\s<>]+",
+    "mention": r"<(?:@[!&]?|#)[0-9]+>"
+}
+TTS_REPLACEMENTS: Final[Dict[str, str]] = {
+    "url": "URL省略",
+    "mention": "メンション省略"
+}
+# いずれかのパターンに一致する文字列は必ずこのどれかを含む
+TTS_TRIGGERS: Final[Tuple[str, ...]] = ("http", "<")
+
+
+class Sanitizer:
+    """複数のパターンを1つの正規表現にまとめ、1回の走査で置換するクラス
+
+    パターンごとに名前付きグループを作り、一致したグループ名から置換後の文字列を選ぶ。
+    triggersのどれも含まないテキストは正規表現を使わずにそのまま返す。
+    """
+
+    def __init__(
+        self,
+        patterns: Dict[str, str],
+        replacements: Dict[str, str],
+        triggers: Tuple[str, ...]
+    ) -> None:
+        self._pattern: Pattern[str] = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items())
+        )
+        self._replacements = replacements
+        self._triggers = triggers
+
+    def _replace(self, match: re.Match) -> str:
+        return self._replacements[match.lastgroup]
+
+    def sanitize(self, text: str) -> str:
+        if not any(trigger in text for trigger in self._triggers):
+            return text
+        return self._pattern.sub(self._replace, text)
+
+
+TTS_SANITIZER: Final[Sanitizer] = Sanitizer(TTS_PATTERNS, TTS_REPLACEMENTS, TTS_TRIGGERS)
+
+
+def escape_mentions(text: str) -> str:
+    """@を全角に置き換え、@everyone・@hereやユーザー・ロールへのメンションを無効化"""
+    if "@" not in text:
+        return text
+    return text.replace("@", "＠")
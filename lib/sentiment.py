@@ -0,0 +1,374 @@
+"""LUKEによる感情分類
+
+torch、transformers、onnxruntimeは読み込みだけで数百MBを消費するため、
+モデルを実際に読み込むときまでimportしない。
+"""
+import asyncio
+import gc
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Callable, Final, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+MODEL_NAME: Final[str] = "Mizuiro-sakura/luke-japanese-large-sentiment-analysis-wrime"
+MAX_SEQ_LENGTH: Final[int] = 512
+DEFAULT_MAX_BATCH_SIZE: Final[int] = 8
+DEFAULT_MAX_WAIT: Final[float] = 0.02  # バッチが揃うまで待つ最大時間（秒）
+DEFAULT_IDLE_TIMEOUT: Final[float] = 600.0  # 最後の推論からモデルを解放するまでの時間（秒）
+
+BACKENDS: Final[Tuple[str, ...]] = ("fp32", "int8", "onnx")
+DEFAULT_BACKEND: Final[str] = "fp32"
+DEFAULT_ONNX_DIR: Final[Path] = Path("data/onnx")
+ONNX_INPUT_NAMES: Final[Tuple[str, ...]] = ("input_ids", "attention_mask")
+
+SENTIMENT_LABELS: Final[Tuple[str, ...]] = (
+    "うれしい", "悲しい", "期待", "驚き", "怒り", "恐れ", "嫌悪", "信頼"
+)
+
+logger = logging.getLogger(__name__)
+
+class SentimentResult(NamedTuple):
+    """感情予測の結果"""
+
+    logits: Tuple[float, ...]
+    index: int
+
+    @property
+    def label(self) -> str:
+        if 0 <= self.index < len(SENTIMENT_LABELS):
+            return SENTIMENT_LABELS[self.index]
+        return "不明"
+
+class SentimentClassifier:
+    """LUKEの感情分類モデルをまとめて推論するクラス
+
+    backendで推論方法を選択する。
+    - fp32: transformersのモデルをそのまま使う
+    - int8: Linear層の重みを動的量子化する
+    - onnx: ONNXに書き出したグラフをONNX Runtimeで実行する（書き出しは初回のみ）
+    """
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        backend: str = DEFAULT_BACKEND,
+        onnx_dir: Path = DEFAULT_ONNX_DIR
+    ) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.session = None
+
+        if backend == "int8":
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+        elif backend == "onnx":
+            self.session = self._load_onnx(model_name, onnx_dir)
+            # 推論にはONNX Runtimeのみを使うため、PyTorch側の重みは解放する
+            self.model = None
+
+    def _load_onnx(self, model_name: str, onnx_dir: Path):
+        import onnxruntime
+
+        path = onnx_dir / f"{model_name.replace('/', '_')}.onnx"
+        if not path.exists():
+            self._export_onnx(path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return onnxruntime.InferenceSession(
+            str(path),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+
+    def _export_onnx(self, path: Path) -> None:
+        import torch
+
+        model = self.model
+
+        class LogitsOnly(torch.nn.Module):
+            def forward(self, input_ids, attention_mask):
+                return model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        sample = self.tokenizer(["サンプル"], return_tensors="pt")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".onnx.tmp")
+        logger.info("Exporting sentiment model to %s", path)
+        with torch.inference_mode():
+            torch.onnx.export(
+                LogitsOnly(),
+                (sample["input_ids"], sample["attention_mask"]),
+                str(tmp_path),
+                input_names=list(ONNX_INPUT_NAMES),
+                output_names=["logits"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "sequence"} for name in ONNX_INPUT_NAMES},
+                    "logits": {0: "batch"}
+                },
+                opset_version=17
+            )
+        tmp_path.replace(path)
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        """複数のテキストを1回の順伝播で推論し、ロジットを返す
+
+        パディングはバッチ内で最も長いテキストに合わせる。
+        """
+        if self.session is not None:
+            encoded = self.tokenizer(
+                texts,
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                padding="longest",
+                return_tensors="np"
+            )
+            inputs = {name: encoded[name].astype(np.int64) for name in ONNX_INPUT_NAMES}
+            return self.session.run(["logits"], inputs)[0]
+
+        import torch
+
+        encoded = self.tokenizer(
+            texts,
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            padding="longest",
+            return_tensors="pt"
+        )
+        with torch.inference_mode():
+            return self.model(**encoded).logits.numpy()
+
+    def classify(self, texts: List[str]) -> List[SentimentResult]:
+        """複数のテキストをまとめて分類"""
+        return [
+            SentimentResult(tuple(row.tolist()), int(row.argmax()))
+            for row in self.logits(texts)
+        ]
+
+# 別プロセスで実行する場合の、ワーカープロセス内のモデル
+_worker_classifier: Optional[SentimentClassifier] = None
+
+
+def _load_in_worker(backend: str) -> None:
+    global _worker_classifier
+    _worker_classifier = SentimentClassifier(backend=backend)
+
+
+def _classify_in_worker(texts: List[str]) -> List[SentimentResult]:
+    return _worker_classifier.classify(texts)
+
+
+class SentimentModelHost:
+    """感情分類モデルを必要なときだけ読み込み、使われなくなったら解放するクラス
+
+    最初の推論で読み込み、同時に届いた呼び出しは同じ読み込みを待つ。
+    最後の推論からidle_timeout秒経つとモデルを解放する。
+    use_processがTrueの場合はモデルを別プロセスに置き、解放時にプロセスごと終了する。
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        use_process: bool = False,
+        backend: str = DEFAULT_BACKEND
+    ) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+        self.idle_timeout = idle_timeout
+        self.use_process = use_process
+        self.backend = backend
+        self._runner: Optional[Tuple[Executor, Callable[[List[str]], List[SentimentResult]]]] = None
+        self._loading: Optional[asyncio.Future] = None
+        self._active = 0
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._runner is not None
+
+    async def _load(self) -> None:
+        loop = asyncio.get_running_loop()
+        logger.info(
+            "Loading sentiment model (backend: %s, separate process: %s)",
+            self.backend,
+            self.use_process
+        )
+        if self.use_process:
+            executor: Executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment")
+
+        try:
+            if self.use_process:
+                await loop.run_in_executor(executor, _load_in_worker, self.backend)
+                self._runner = (executor, _classify_in_worker)
+            else:
+                classifier = await loop.run_in_executor(
+                    executor,
+                    partial(SentimentClassifier, backend=self.backend)
+                )
+                self._runner = (executor, classifier.classify)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            self._loading = None
+
+    async def _acquire(self) -> Tuple[Executor, Callable[[List[str]], List[SentimentResult]]]:
+        while self._runner is None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._load())
+            await asyncio.shield(self._loading)
+
+        self._active += 1
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        return self._runner
+
+    def _release(self) -> None:
+        self._active -= 1
+        if self._active == 0 and self.idle_timeout > 0:
+            self._idle_handle = asyncio.get_running_loop().call_later(
+                self.idle_timeout,
+                lambda: asyncio.ensure_future(self.unload())
+            )
+
+    async def classify(self, texts: List[str]) -> List[SentimentResult]:
+        """テキストを分類（モデルが未読み込みなら読み込む）"""
+        executor, classify = await self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor,
+                classify,
+                texts
+            )
+        except BrokenProcessPool:
+            # ワーカープロセスが落ちた（メモリ不足など）場合は、次の呼び出しで読み込み直す
+            if self._runner is not None and self._runner[0] is executor:
+                logger.warning("Sentiment worker process died; the model will be reloaded")
+                self._runner = None
+                executor.shutdown(wait=False)
+            raise
+        finally:
+            self._release()
+
+    async def unload(self) -> None:
+        """推論中でなければモデルを解放"""
+        if self._runner is None or self._active:
+            return
+
+        executor, _ = self._runner
+        self._runner = None
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+        logger.info("Unloading sentiment model")
+        if self.use_process:
+            # プロセスの終了を待つ間イベントループを塞がない
+            await asyncio.to_thread(executor.shutdown, True)
+        else:
+            executor.shutdown(wait=False)
+            await asyncio.to_thread(gc.collect)
+
+class SentimentBatcher:
+    """同時に届いた推論リクエストをまとめて推論するクラス
+
+    最初のリクエストからmax_wait秒、またはmax_batch_size件に達するまで待ってから推論する。
+    """
+
+    def __init__(
+        self,
+        host: SentimentModelHost,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT
+    ) -> None:
+        self.host = host
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def classify(self, text: str) -> SentimentResult:
+        """テキストを分類（他のリクエストとまとめて推論される）"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """batchにリクエストを集める（キャンセルされても集めた分はbatchに残る）"""
+        batch.append(await self._queue.get())
+        # wait_forはキャンセルと完了が重なるとキャンセルを握りつぶすため、timeoutを使う
+        try:
+            async with asyncio.timeout(self.max_wait):
+                while len(batch) < self.max_batch_size:
+                    batch.append(await self._queue.get())
+        except TimeoutError:
+            pass
+        batch[:] = [(text, future) for text, future in batch if not future.cancelled()]
+
+    async def _run(self) -> None:
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = []
+                await self._collect_batch(batch)
+                if not batch:
+                    continue
+
+                try:
+                    results = await self.host.classify([text for text, _ in batch])
+                except Exception as e:
+                    logger.error("Sentiment inference failed: %s", e, exc_info=True)
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        except asyncio.CancelledError:
+            # キューから取り出し済みのリクエストも待たせたままにしない
+            for _, future in batch:
+                future.cancel()
+            raise
+
+    async def close(self) -> None:
+        """バッチ処理を停止し、待機中のリクエストを取り消してモデルを解放"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+        await self.host.unload()
@@ -0,0 +1,78 @@
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Final, Optional, Tuple
+
+from lib.sentiment import MAX_SEQ_LENGTH, SentimentResult
+
+DEFAULT_MAX_ENTRIES: Final[int] = 1024
+DEFAULT_TTL: Final[float] = 60 * 60.0
+
+
+def normalize_text(text: str) -> str:
+    """キャッシュのキーと推論に使うテキストの正規化（全角・半角の統一と前後の空白の除去）"""
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+class SentimentCache:
+    """感情予測結果のキャッシュ
+
+    キーは正規化したテキストと切り詰め長のハッシュ。長いメッセージでもキーの大きさは一定。
+    件数上限付きのLRUで保持し、ttl秒を過ぎた結果は使わない。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+        max_length: int = MAX_SEQ_LENGTH,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_length = max_length
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, SentimentResult]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{self.max_length}\0{normalize_text(text)}".encode(),
+            digest_size=16
+        ).digest()
+
+    def get(self, text: str) -> Optional[SentimentResult]:
+        key = self._key(text)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, text: str, result: SentimentResult) -> None:
+        key = self._key(text)
+        self._entries[key] = (self._clock() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """監視用のヒット数・ミス数・ヒット率・件数"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries)
+        }
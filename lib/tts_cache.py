@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Final, List, Optional
+
+DEFAULT_MAX_MEMORY_BYTES: Final[int] = 16 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES: Final[int] = 256 * 1024 * 1024
+FILE_SUFFIX: Final[str] = ".opus"
+TMP_SUFFIX: Final[str] = ".tmp"
+
+WHITESPACE_PATTERN: Final[re.Pattern] = re.compile(r"\s+")
+
+Packets = List[bytes]
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """読み上げ結果が変わらない範囲でテキストを正規化"""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(voice: str, text: str, volume: float) -> str:
+    """(音声, 音量, 正規化したテキスト)から内容アドレスのキーを作成"""
+    return hashlib.blake2b(
+        f"{voice}\0{volume}\0{normalize_text(text)}".encode(),
+        digest_size=16
+    ).hexdigest()
+
+
+def _pack(packets: Packets) -> bytes:
+    return b"".join(len(p).to_bytes(2, "big") + p for p in packets)
+
+
+def _unpack(data: bytes) -> Packets:
+    packets = []
+    offset = 0
+    while offset < len(data):
+        length = int.from_bytes(data[offset:offset + 2], "big")
+        offset += 2
+        packets.append(data[offset:offset + length])
+        offset += length
+    return packets
+
+
+class TTSAudioCache:
+    """合成済み音声（20msごとのOpusパケット）のキャッシュ
+
+    ヒット時は合成もffmpegによる変換も行わずにそのまま送信できる。
+    メモリ上とディスク上の2段で、どちらもサイズ上限付きのLRUで破棄する。
+    ディスク上の順序は最終アクセス日時(mtime)で管理する。
+    ディスク上の既存のキャッシュはinitializeを呼ぶまで使われない。
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        cache_dir: Optional[Path] = None
+    ) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Packets]" = OrderedDict()
+        self._size = 0
+        self._disk_lock = threading.Lock()
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _nbytes(packets: Packets) -> int:
+        return sum(len(p) for p in packets)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{FILE_SUFFIX}"
+
+    def _scan_disk(self) -> None:
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(TMP_SUFFIX):
+                # 書き込み途中で中断された一時ファイル
+                Path(entry.path).unlink(missing_ok=True)
+            elif entry.name.endswith(FILE_SUFFIX):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(FILE_SUFFIX)], stat.st_size))
+        files.sort()
+
+        with self._disk_lock:
+            # 走査中に書き込まれたものは上書きしない
+            scanned: "OrderedDict[str, int]" = OrderedDict()
+            for _, key, size in files:
+                if key not in self._disk_entries:
+                    scanned[key] = size
+                    self._disk_size += size
+            scanned.update(self._disk_entries)
+            self._disk_entries = scanned
+
+    async def initialize(self) -> None:
+        """ディスク上の既存のキャッシュを読み込む（ワーカースレッドで走査）"""
+        if self.cache_dir is None:
+            return
+        try:
+            await asyncio.to_thread(self._scan_disk)
+        except Exception as e:
+            logger.warning("Failed to scan TTS cache: %s", e)
+
+    def get(self, key: str) -> Optional[Packets]:
+        """メモリ上のキャッシュを参照"""
+        packets = self._entries.get(key)
+        if packets is not None:
+            self._entries.move_to_end(key)
+        return packets
+
+    def put(self, key: str, packets: Packets) -> None:
+        """メモリ上のキャッシュに追加し、上限を超えた分を古い順に破棄"""
+        if (old := self._entries.pop(key, None)) is not None:
+            self._size -= self._nbytes(old)
+        self._entries[key] = packets
+        self._size += self._nbytes(packets)
+        while self._size > self.max_memory_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._nbytes(evicted)
+
+    def _read_file(self, key: str) -> Optional[Packets]:
+        with self._disk_lock:
+            if key not in self._disk_entries:
+                return None
+            self._disk_entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._disk_lock:
+                if (size := self._disk_entries.pop(key, None)) is not None:
+                    self._disk_size -= size
+            return None
+        return _unpack(data)
+
+    def _write_file(self, key: str, packets: Packets) -> None:
+        data = _pack(packets)
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        with self._disk_lock:
+            if (old := self._disk_entries.pop(key, None)) is not None:
+                self._disk_size -= old
+            self._disk_entries[key] = len(data)
+            self._disk_size += len(data)
+            evicted = []
+            while self._disk_size > self.max_disk_bytes and len(self._disk_entries) > 1:
+                evicted_key, size = self._disk_entries.popitem(last=False)
+                self._disk_size -= size
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self._path(evicted_key).unlink(missing_ok=True)
+
+    async def load(self, key: str) -> Optional[Packets]:
+        """メモリ、ディスクの順にキャッシュを参照し、ディスクにあればメモリに載せる"""
+        if (packets := self.get(key)) is not None or self.cache_dir is None:
+            return packets
+
+        try:
+            packets = await asyncio.to_thread(self._read_file, key)
+        except Exception as e:
+            logger.warning("Failed to read TTS cache %s: %s", key, e)
+            return None
+        if packets is not None:
+            self.put(key, packets)
+        return packets
+
+    async def store(self, key: str, packets: Packets) -> None:
+        """キャッシュに保存（ディスクへの書き込みはワーカースレッドで実行）"""
+        self.put(key, packets)
+        if self.cache_dir is None:
+            return
+
+        try:
+            await asyncio.to_thread(self._write_file, key, packets)
+        except Exception as e:
+            logger.warning("Failed to write TTS cache %s: %s", key, e)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class UserCountStore:
+    """ユーザー数ファイルの共有ストア
+
+    書き込みは一時ファイル+リネームでアトミックに行い、バックグラウンドでまとめて実行する。
+    読み込みはmtimeで検証したメモリキャッシュから返す。
+    """
+
+    def __init__(self, file_path: Path, revalidate_interval: float = 1.0) -> None:
+        self.file_path = file_path
+        self.revalidate_interval = revalidate_interval
+        self._cached: Optional[int] = None
+        self._cached_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._pending: Optional[int] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def read(self) -> int:
+        """ユーザー数を取得
+
+        キャッシュが新しい間はファイルに触れない。
+        ファイルが存在しない場合はFileNotFoundError、壊れている場合はJSONDecodeErrorを送出する。
+        """
+        now = time.monotonic()
+        if self._cached is not None and now - self._checked_at < self.revalidate_interval:
+            return self._cached
+
+        mtime = self.file_path.stat().st_mtime_ns
+        if self._cached is None or mtime != self._cached_mtime:
+            data = json.loads(self.file_path.read_text(encoding="utf-8"))
+            self._cached = data.get("total_users", 0)
+            self._cached_mtime = mtime
+        self._checked_at = now
+        return self._cached
+
+    def write(self, count: int) -> int:
+        """ユーザー数をアトミックに書き込み、書き込んだファイルのmtimeを返す（同期・キャッシュは更新しない）"""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.file_path.parent,
+            prefix=f".{self.file_path.name}.",
+            suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"total_users": count}, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return self.file_path.stat().st_mtime_ns
+
+    def schedule_write(self, count: int) -> None:
+        """書き込みをバックグラウンドに登録
+
+        書き込み中に届いた値は最新のものだけを次回にまとめて書き込む。
+        """
+        self._pending = count
+        self._cached = count
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._pending is not None:
+            count, self._pending = self._pending, None
+            try:
+                mtime = await asyncio.to_thread(self.write, count)
+            except Exception as e:
+                logger.error("Error writing user count: %s", e, exc_info=True)
+                continue
+
+            # キャッシュはイベントループ側でのみ更新する。書き込み中に新しい値が届いていれば触れない
+            if self._pending is None:
+                self._cached = count
+                self._cached_mtime = mtime
+                self._checked_at = time.monotonic()
+
+    async def flush(self) -> None:
+        """未書き込みの値を書き終えるまで待機"""
+        if self._writer is not None and not self._writer.done():
+            await self._writer
+        if self._pending is not None:
+            await self._drain()
@@ -1,9 +1,21 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 import sqlite3
-from typing import Final, Optional, List, Dict, Any
+import asyncio
+import base64
+import binascii
+import hashlib
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Final, Optional, List, Dict, Any, Iterator, NamedTuple, Tuple
 from pydantic import BaseModel, Field
 from datetime import datetime
 import logging
@@ -13,6 +25,8 @@ import uvicorn
 from dotenv import load_dotenv
 import os
 
+from module.user_count import UserCountStore
+
 load_dotenv()
 
 security = HTTPBasic()
@@ -20,6 +34,25 @@ security = HTTPBasic()
 APP_TITLE: Final[str] = "Server Board API"
 HOST: Final[str] = "localhost"
 PORT: Final[int] = 8000
+DB_POOL_SIZE: Final[int] = 4
+SERVER_CACHE_TTL: Final[float] = 5.0  # サーバー一覧キャッシュの有効期間（秒）
+PAGE_CACHE_SIZE: Final[int] = 64
+MAX_PAGE_SIZE: Final[int] = 100
+
+# last_up_time DESCではNULLが末尾に並ぶため、未upのサーバーは自然に後ろへ回る
+# server_id(rowid)はidx_servers_last_up_registeredの末尾に暗黙で含まれる
+SERVER_ORDER_SQL: Final[str] = (
+    "ORDER BY last_up_time DESC, registered_at DESC, server_id DESC"
+)
+COMPACT_FIELDS: Final[Tuple[str, ...]] = (
+    "server_id",
+    "server_name",
+    "icon_url",
+    "description",
+    "last_up_time",
+    "registered_at",
+    "invite_url"
+)
 
 PATHS: Final[dict] = {
     "db": Path(__file__).parent / "data/server_board.db",
@@ -38,6 +71,7 @@ ERROR_MESSAGES: Final[dict] = {
     "db_not_found": "DBファイルが見つかりません: {}",
     "table_not_found": "サーバーテーブルが存在しません",
     "server_not_found": "サーバーが見つかりません",
+    "invalid_cursor": "不正なカーソルです",
     "user_count_not_found": "ユーザー数ファイルが見つかりません: {}",
     "db_error": "DBエラー: {}",
     "json_error": "JSONデコードエラー: {}",
@@ -64,22 +98,71 @@ class Server(BaseModel):
     invite_url: Optional[str] = Field(None, description="招待URL")
     time_since_last_up: Optional[str] = Field(None, description="最終アップからの経過時間")
 
+class ServerPage(NamedTuple):
+    """キャッシュされたサーバー一覧の1ページ"""
+
+    servers: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+    etag: str
+    last_modified: float
+    compact_body: bytes
+    cached_at: float
+
+class ConnectionPool:
+    """スレッド間で使い回すSQLite接続プール"""
+
+    def __init__(self, db_path: Path, size: int) -> None:
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._connections.put(conn)
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
 class DatabaseManager:
-    """DB操作を管理するクラス"""
+    """DB操作を管理するクラス
+
+    接続はプールで使い回し、クエリはワーカースレッドで実行してイベントループを塞がない。
+    サーバー一覧は短いTTLでキャッシュし、他の接続（ボット側の/upなど）が
+    DBに書き込んだ時点でPRAGMA data_versionの変化により無効化する。
+    """
 
     def __init__(self, db_path: Path) -> None:
         self.db_path = db_path
-
-    def get_connection(self) -> sqlite3.Connection:
-        if not self.db_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail=ERROR_MESSAGES["db_not_found"].format(self.db_path)
-            )
-
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        self._pool: Optional[ConnectionPool] = None
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._init_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._page_cache: "OrderedDict[Tuple[Optional[int], Optional[str]], ServerPage]" = OrderedDict()
+        self._cache_version: Optional[int] = None
+
+    def _ensure_pool(self) -> ConnectionPool:
+        if self._pool is not None:
+            return self._pool
+
+        with self._init_lock:
+            if self._pool is None:
+                if not self.db_path.exists():
+                    raise HTTPException(
+                        status_code=500,
+                        detail=ERROR_MESSAGES["db_not_found"].format(self.db_path)
+                    )
+
+                pool = ConnectionPool(self.db_path, DB_POOL_SIZE)
+                with pool.acquire() as conn:
+                    self.check_table_exists(conn)
+                self._watcher = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._pool = pool
+        return self._pool
 
     def check_table_exists(self, conn: sqlite3.Connection) -> None:
         """テーブルの存在確認"""
@@ -93,20 +176,152 @@ class DatabaseManager:
                 detail=ERROR_MESSAGES["table_not_found"]
             )
 
-    async def get_all_servers(self) -> List[Dict[str, Any]]:
+    def _data_version(self) -> int:
+        """他の接続からコミットがあるたびに変化する値を取得"""
+        with self._watch_lock:
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def encode_cursor(server: Dict[str, Any]) -> str:
+        raw = json.dumps(
+            [server["last_up_time"], server["registered_at"], server["server_id"]]
+        )
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[Optional[str], str, int]:
+        try:
+            last_up, registered_at, server_id = json.loads(
+                base64.urlsafe_b64decode(cursor.encode())
+            )
+            return last_up, registered_at, int(server_id)
+        except (ValueError, TypeError, binascii.Error) as e:
+            raise HTTPException(
+                status_code=400,
+                detail=ERROR_MESSAGES["invalid_cursor"]
+            ) from e
+
+    def _build_page_query(
+        self,
+        limit: Optional[int],
+        cursor: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        """
+        キーセット方式のページングクエリを構築
+
+        last_up_timeがNULLでない範囲とNULLの範囲は別々の副問い合わせにしてUNION ALLでつなぐ。
+        ORで1つの条件にするとインデックスをシークできず全件走査になる。
+        UNION ALLは左から順に返すため、NULLの行は従来どおり末尾に並ぶ。
+        """
+        limit_sql = ""
+        limit_params: List[Any] = []
+        if limit is not None:
+            # 次ページの有無を判定するため1件多く取得
+            limit_sql = " LIMIT ?"
+            limit_params = [limit + 1]
+
+        if not cursor:
+            return f"SELECT * FROM servers {SERVER_ORDER_SQL}{limit_sql}", limit_params
+
+        last_up, registered_at, server_id = self.decode_cursor(cursor)
+        if last_up is None:
+            query = (
+                "SELECT * FROM servers"
+                " WHERE last_up_time IS NULL AND (registered_at, server_id) < (?, ?)"
+                f" {SERVER_ORDER_SQL}{limit_sql}"
+            )
+            return query, [registered_at, server_id, *limit_params]
+
+        query = (
+            "SELECT * FROM ("
+            "SELECT * FROM servers"
+            " WHERE (last_up_time, registered_at, server_id) < (?, ?, ?)"
+            f" {SERVER_ORDER_SQL}{limit_sql}"
+            ") UNION ALL SELECT * FROM ("
+            f"SELECT * FROM servers WHERE last_up_time IS NULL {SERVER_ORDER_SQL}{limit_sql}"
+            f"){limit_sql}"
+        )
+        return query, [last_up, registered_at, server_id, *limit_params, *limit_params, *limit_params]
+
+    @staticmethod
+    def _compact_server(server: Dict[str, Any]) -> Dict[str, Any]:
+        compact = {field: server.get(field) for field in COMPACT_FIELDS}
+        # last_up_timeはサーバーのローカル時刻のため、閲覧者のタイムゾーンに依存しないUNIX秒も含める
+        last_up = server.get("last_up_time")
+        compact["last_up_timestamp"] = (
+            int(datetime.fromisoformat(last_up).timestamp()) if last_up else None
+        )
+        return compact
+
+    def _fetch_servers_page(
+        self,
+        limit: Optional[int],
+        cursor: Optional[str]
+    ) -> ServerPage:
+        pool = self._ensure_pool()
+        version = self._data_version()
+        key = (limit, cursor)
+        with self._cache_lock:
+            if version != self._cache_version:
+                self._page_cache.clear()
+                self._cache_version = version
+
+            page = self._page_cache.get(key)
+            if page is not None and time.monotonic() - page.cached_at < SERVER_CACHE_TTL:
+                self._page_cache.move_to_end(key)
+                return page
+
+        query, params = self._build_page_query(limit, cursor)
+        with pool.acquire() as conn:
+            servers = [dict(row) for row in conn.execute(query, params).fetchall()]
+
+        next_cursor = None
+        if limit is not None and len(servers) > limit:
+            servers = servers[:limit]
+            next_cursor = self.encode_cursor(servers[-1])
+
+        compact_body = json.dumps(
+            [self._compact_server(server) for server in servers],
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        etag = hashlib.blake2b(compact_body, digest_size=12).hexdigest()
+        # 前回と内容が同じならLast-Modifiedを据え置く
+        last_modified = (
+            page.last_modified if page is not None and page.etag == etag
+            else float(int(time.time()))
+        )
+
+        page = ServerPage(
+            servers=servers,
+            next_cursor=next_cursor,
+            etag=etag,
+            last_modified=last_modified,
+            compact_body=compact_body,
+            cached_at=time.monotonic()
+        )
+        with self._cache_lock:
+            self._page_cache[key] = page
+            self._page_cache.move_to_end(key)
+            while len(self._page_cache) > PAGE_CACHE_SIZE:
+                self._page_cache.popitem(last=False)
+        return page
+
+    def _fetch_server(self, server_id: int) -> Optional[Dict[str, Any]]:
+        with self._ensure_pool().acquire() as conn:
+            row = conn.execute(
+                "SELECT * FROM servers WHERE server_id = ?",
+                (server_id,)
+            ).fetchone()
+            return dict(row) if row else None
+
+    async def get_servers_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> ServerPage:
         try:
-            with self.get_connection() as conn:
-                self.check_table_exists(conn)
-                cursor = conn.cursor()
-
-                cursor.execute("""
-                    SELECT * FROM servers
-                    ORDER BY
-                        CASE WHEN last_up_time IS NULL THEN 0 ELSE 1 END DESC,
-                        last_up_time DESC,
-                        registered_at DESC
-                """)
-                return [dict(row) for row in cursor.fetchall()]
+            return await asyncio.to_thread(self._fetch_servers_page, limit, cursor)
 
         except sqlite3.Error as e:
             logger.error("Database error: %s", e, exc_info=True)
@@ -117,19 +332,13 @@ class DatabaseManager:
 
     async def get_server(self, server_id: int) -> Dict[str, Any]:
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT * FROM servers WHERE server_id = ?",
-                    (server_id,)
-                )
-                if server := cursor.fetchone():
-                    return dict(server)
+            if server := await asyncio.to_thread(self._fetch_server, server_id):
+                return server
 
-                raise HTTPException(
-                    status_code=404,
-                    detail=ERROR_MESSAGES["server_not_found"]
-                )
+            raise HTTPException(
+                status_code=404,
+                detail=ERROR_MESSAGES["server_not_found"]
+            )
 
         except sqlite3.Error as e:
             logger.error("Database error: %s", e, exc_info=True)
@@ -168,19 +377,19 @@ class UserCountManager:
 
     def __init__(self, file_path: Path) -> None:
         self.file_path = file_path
+        self._store = UserCountStore(file_path)
 
     async def get_total_users(self) -> int:
-        if not self.file_path.exists():
+        try:
+            return self._store.read()
+
+        except FileNotFoundError as e:
             raise HTTPException(
                 status_code=500,
                 detail=ERROR_MESSAGES["user_count_not_found"].format(
                     self.file_path
                 )
-            )
-
-        try:
-            data = json.loads(self.file_path.read_text(encoding="utf-8"))
-            return data.get("total_users", 0)
+            ) from e
 
         except json.JSONDecodeError as e:
             logger.error("JSON decode error: %s", e, exc_info=True)
@@ -210,7 +419,9 @@ class ServerBoardAPI:
             allow_origins=["*"],
             allow_credentials=True,
             allow_methods=["*"],
-            allow_headers=["*"]
+            allow_headers=["*"],
+            # 別オリジンのページからもキャッシュ検証とページングのヘッダーを読めるようにする
+            expose_headers=["ETag", "Last-Modified", "X-Next-Cursor"]
         )
 
     def _setup_routes(self) -> None:
@@ -240,15 +451,87 @@ class ServerBoardAPI:
                 server["time_since_last_up"] = None
         return servers
 
-    async def get_servers(self) -> List[Server]:
-        """全サーバー情報を取得するエンドポイント"""
+    @staticmethod
+    def _is_not_modified(
+        request: Request,
+        etag: str,
+        last_modified: Optional[float]
+    ) -> bool:
+        if if_none_match := request.headers.get("if-none-match"):
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or f'"{etag}"' in tags
+
+        if last_modified is not None and (
+            if_modified_since := request.headers.get("if-modified-since")
+        ):
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return last_modified <= since
+
+        return False
+
+    async def get_servers(
+        self,
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        compact: bool = False
+    ) -> Response:
+        """
+        サーバー情報を取得するエンドポイント
+
+        Parameters
+        ----------
+        limit : Optional[int]
+            1ページあたりの件数。省略時は全件
+        cursor : Optional[str]
+            前ページのX-Next-Cursorヘッダーの値
+        compact : bool
+            Trueの場合はモデル変換と経過時間の計算を省略した軽量形式で返す
+        """
         try:
-            servers = await self.db.get_all_servers()
-            if not servers:
-                return []
+            page = await self.db.get_servers_page(limit, cursor)
+
+            headers = {"Cache-Control": "no-cache"}
+            if page.next_cursor:
+                headers["X-Next-Cursor"] = page.next_cursor
+
+            if compact:
+                etag = f"c-{page.etag}"
+                last_modified: Optional[float] = page.last_modified
+                headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+            else:
+                # 経過時間の表示は時間とともに変わるためETagに含める
+                servers = self._process_server_data(
+                    [dict(server) for server in page.servers]
+                )
+                time_labels = "|".join(
+                    server["time_since_last_up"] or "" for server in servers
+                )
+                etag = f"{page.etag}-" + hashlib.blake2b(
+                    time_labels.encode("utf-8"), digest_size=6
+                ).hexdigest()
+                last_modified = None
+
+            headers["ETag"] = f'W/"{etag}"'
+            if self._is_not_modified(request, etag, last_modified):
+                return Response(status_code=304, headers=headers)
+
+            if compact:
+                return Response(
+                    content=page.compact_body,
+                    media_type="application/json",
+                    headers=headers
+                )
+            return JSONResponse(
+                content=jsonable_encoder([Server(**server) for server in servers]),
+                headers=headers
+            )
 
-            processed_servers = self._process_server_data(servers)
-            return [Server(**server) for server in processed_servers]
+        except HTTPException:
+            raise
 
         except Exception as e:
             logger.error("Unexpected error: %s", e, exc_info=True)